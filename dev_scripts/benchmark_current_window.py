@@ -0,0 +1,94 @@
+"""
+benchmark_current_window.py
+
+Track the latency of ``league_model.get_matches_in_current_window``, which 
+serves the league homepage, the admin's match reports and player comparisons. 
+
+Warning: this drops all the tables first, like ``clean_database.py``, and then 
+seeds a league whose matches have all been played. Usage:
+
+    python benchmark_current_window.py [num_players [num_calls]]
+
+"""
+
+import sys
+sys.path.insert(0, "..")
+
+from math import inf
+from time import monotonic
+from random import randint
+
+from tiger_leagues.models import league_model, admin_model, db_model
+from dev_scripts.clean_database import clean_database
+from dev_scripts import simulate_tiger_leagues as sim
+
+db = db_model.db
+
+def seed_league(num_players):
+    """
+    :return: ``tuple(dict, list[dict])``
+
+    The information about the seeded league and its players
+    """
+    clean_database()
+    users = sim.register_fake_users(num_users=num_players)
+    league_info = sim.create_league(users[0])
+    sim.enroll_members(league_info, users[1:])
+    league_info["num_active_players"] = num_players
+    sim.generate_divisions_and_fixtures(league_info)
+
+    cursor = db.execute(
+        "SELECT match_id FROM match_info WHERE league_id = %s;", 
+        values=[league_info["league_id"]]
+    )
+    for row in cursor.fetchall():
+        admin_model.approve_match({
+            "score_user_1": randint(0, 5), "score_user_2": randint(0, 5),
+            "match_id": row["match_id"]
+        }, users[0]["user_id"])
+    return league_info, users
+
+def time_calls(num_calls, **kwargs):
+    """
+    :return: ``tuple(float, float, int, int)``
+
+    The median and the maximum latency in milliseconds, the number of 
+    statements per call and the number of matches returned
+    """
+    latencies = []
+    num_statements = db.statement_count()
+    for _ in range(num_calls):
+        start_time = monotonic()
+        matches = league_model.get_matches_in_current_window(**kwargs)
+        latencies.append((monotonic() - start_time) * 1000)
+    num_statements = (db.statement_count() - num_statements) // num_calls
+
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[-1], num_statements, len(matches)
+
+if __name__ == "__main__":
+    num_players = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    num_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    league_info, users = seed_league(num_players)
+
+    print("\n{} players, {} calls per row".format(num_players, num_calls))
+    print("  {:>24}  {:>8}  {:>11}  {:>8}  {:>8}".format(
+        "window", "matches", "statements", "p50 ms", "max ms"
+    ))
+    for description, kwargs in [
+        ("3 periods, whole league", {"num_periods_before": 3, "num_periods_after": 3}),
+        ("season, whole league", {"num_periods_before": inf, "num_periods_after": inf}),
+        ("4 periods, one player", {
+            "num_periods_before": 4, "num_periods_after": 4, "user_id": users[1]["user_id"]
+        }),
+        ("season, one player", {
+            "num_periods_before": inf, "num_periods_after": inf, "user_id": users[1]["user_id"]
+        }),
+    ]:
+        median_ms, max_ms, num_statements, num_matches = time_calls(
+            num_calls, league_id=league_info["league_id"], **kwargs
+        )
+        print("  {:>24}  {:>8}  {:>11}  {:>8.2f}  {:>8.2f}".format(
+            description, num_matches, num_statements, median_ms, max_ms
+        ))
+    db.disconnect()
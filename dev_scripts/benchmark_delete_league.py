@@ -0,0 +1,72 @@
+"""
+benchmark_delete_league.py
+
+Time ``admin_model.delete_league`` on a league that has started, i.e. one with 
+memberships, fixtures, standings and notifications. Counts the statements that 
+the deletion sends, which shouldn't grow with the number of members.
+
+Warning: this drops all the tables first, like ``clean_database.py``. Usage:
+
+    python benchmark_delete_league.py [num_members ...]
+
+"""
+
+import sys
+sys.path.insert(0, "..")
+
+from time import monotonic
+
+from tiger_leagues.models import admin_model, db_model
+from dev_scripts.clean_database import clean_database
+from dev_scripts import simulate_tiger_leagues as sim
+
+db = db_model.db
+
+def count_league_rows(league_id):
+    """
+    :return: ``dict``
+
+    The number of rows that refer to the league, keyed by the table's name
+    """
+    return {
+        table_name: db.execute(
+            "SELECT COUNT(*) FROM {} WHERE league_id = %s;".format(table_name),
+            values=[league_id]
+        ).fetchone()[0]
+        for table_name in [
+            "league_memberships", "match_info", "league_standings", "notifications"
+        ]
+    }
+
+def benchmark(num_members):
+    """
+    Print how long it takes to delete a league with ``num_members`` members.
+    """
+    clean_database()
+    users = sim.register_fake_users(num_users=num_members)
+    league_info = sim.create_league(users[0])
+    sim.enroll_members(league_info, users[1:])
+    league_info["num_active_players"] = num_members
+    sim.generate_divisions_and_fixtures(league_info)
+    rows_before = count_league_rows(league_info["league_id"])
+
+    num_statements = db.statement_count()
+    start_time = monotonic()
+    results = admin_model.delete_league(league_info["league_id"])
+    elapsed_ms = (monotonic() - start_time) * 1000
+    num_statements = db.statement_count() - num_statements
+
+    print("\n{} members: {} ({:.1f} ms, {} statements)".format(
+        num_members, results["message"], elapsed_ms, num_statements
+    ))
+    rows_after = count_league_rows(league_info["league_id"])
+    for table_name, num_rows in rows_before.items():
+        print("  {:>20}: {:>6} rows before, {} after".format(
+            table_name, num_rows, rows_after[table_name]
+        ))
+
+if __name__ == "__main__":
+    league_sizes = [int(x) for x in sys.argv[1:]] or [50, 500]
+    for league_size in league_sizes:
+        benchmark(league_size)
+    db.disconnect()
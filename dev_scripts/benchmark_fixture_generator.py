@@ -0,0 +1,91 @@
+"""
+benchmark_fixture_generator.py
+
+Time the round-robin engine in ``admin_model`` as divisions grow. The full 
+schedule is consumed lazily, so only one round is held in memory at a time. 
+
+Also compares the peak memory of encoding a multi-leg schedule for ``COPY`` 
+with ``db_model.RecordsReader``, as ``generate_league_fixtures`` does, against 
+collecting the rows in a list first. Tracing the memory slows that part down 
+to a few minutes. Runs without a database. Usage:
+
+    python benchmark_fixture_generator.py [num_players ...]
+
+"""
+
+import sys
+sys.path.insert(0, "..")
+
+from time import monotonic
+from datetime import date
+import tracemalloc
+
+from tiger_leagues.models import admin_model, db_model
+
+def benchmark(num_players):
+    """
+    :return: ``tuple(int, int, float, float)``
+
+    The number of rounds and of matches in the schedule, the time it took to 
+    generate the whole schedule, and the time it took to generate its middle 
+    round on its own, both in milliseconds
+    """
+    user_ids = list(range(1, num_players + 1))
+
+    start_time = monotonic()
+    num_rounds, num_matches = 0, 0
+    for current_matches in admin_model.iter_fixture_rounds(user_ids):
+        num_rounds += 1
+        num_matches += len(current_matches)
+    schedule_ms = (monotonic() - start_time) * 1000
+
+    start_time = monotonic()
+    admin_model.fixture_round(user_ids, num_rounds // 2)
+    round_ms = (monotonic() - start_time) * 1000
+
+    assert num_matches == num_players * (num_players - 1) // 2
+    return num_rounds, num_matches, schedule_ms, round_ms
+
+def peak_copy_memory(num_players, num_legs, streamed):
+    """
+    :return: ``tuple(int, float)``
+
+    The peak memory in MB, and the time in milliseconds, that it took to encode 
+    the schedule of a division for ``COPY``, in 8 KB chunks like psycopg2 does
+    """
+    user_ids = list(range(1, num_players + 1))
+    deadline = date.today()
+    tracemalloc.start()
+    start_time = monotonic()
+
+    records = (
+        (user_1_id, user_2_id, 1, 1, deadline)
+        for current_matches in admin_model.iter_fixture_rounds(user_ids, num_legs=num_legs)
+        for user_1_id, user_2_id in current_matches
+    )
+    if not streamed: records = list(records)
+    reader = db_model.RecordsReader(records)
+    while reader.read(8192): pass
+
+    elapsed_ms = (monotonic() - start_time) * 1000
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak_bytes / 2 ** 20, elapsed_ms
+
+if __name__ == "__main__":
+    division_sizes = [int(x) for x in sys.argv[1:]] or [10, 100, 1000, 5000, 10000]
+    print("  {:>8}  {:>7}  {:>11}  {:>12}  {:>9}  {:>11}".format(
+        "players", "rounds", "matches", "schedule ms", "ns/match", "1 round ms"
+    ))
+    for division_size in division_sizes:
+        num_rounds, num_matches, schedule_ms, round_ms = benchmark(division_size)
+        print("  {:>8}  {:>7}  {:>11}  {:>12.1f}  {:>9.0f}  {:>11.3f}".format(
+            division_size, num_rounds, num_matches, schedule_ms, 
+            schedule_ms * 1e6 / max(num_matches, 1), round_ms
+        ))
+
+    num_players, num_legs = 2000, 4
+    print("\nEncoding a {}-player, {}-leg division for COPY".format(num_players, num_legs))
+    for description, streamed in [("streamed", True), ("list first", False)]:
+        peak_mb, elapsed_ms = peak_copy_memory(num_players, num_legs, streamed)
+        print("  {:>10}: peak {:>8.1f} MB in {:>8.0f} ms".format(description, peak_mb, elapsed_ms))
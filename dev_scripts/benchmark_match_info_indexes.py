@@ -0,0 +1,134 @@
+"""
+benchmark_match_info_indexes.py
+
+Compare the query plans of the hot ``match_info`` queries with and without the
+indexes in ``db_model.MATCH_INFO_INDEXES``, as the table grows.
+
+The matches are generated in a temporary copy of ``match_info``, so the real
+tables are left untouched. Usage:
+
+    python benchmark_match_info_indexes.py [num_rows ...]
+
+"""
+
+import sys
+sys.path.insert(0, "..")
+
+from time import monotonic
+
+from tiger_leagues.models import db_model
+
+db = db_model.db
+
+NUM_PLAYERS_PER_DIVISION = 20
+NUM_DIVISIONS_PER_LEAGUE = 5
+
+HOT_QUERIES = [
+    (
+        "Approved matches in a division (standings)",
+        "SELECT user_1_id, user_2_id, score_user_1, score_user_2 FROM bench_match_info "
+        "WHERE league_id = %(league_id)s AND division_id = 1 AND status = 'approved';"
+    ),
+    (
+        "A league's matches around today (fixtures page)",
+        "SELECT * FROM bench_match_info WHERE league_id = %(league_id)s "
+        "AND deadline >= CURRENT_DATE - 21 AND deadline <= CURRENT_DATE + 21 "
+        "ORDER BY deadline;"
+    ),
+    (
+        "A player's matches around today (player page)",
+        "SELECT * FROM bench_match_info WHERE league_id = %(league_id)s "
+        "AND (user_1_id = %(user_id)s OR user_2_id = %(user_id)s) "
+        "AND deadline >= CURRENT_DATE - 28 AND deadline <= CURRENT_DATE + 28 "
+        "ORDER BY deadline;"
+    ),
+]
+
+def seed_matches(num_rows):
+    """
+    Fill ``bench_match_info`` with ``num_rows`` matches. Each league has 100
+    players in 5 divisions, one match per pair of players in a division, and
+    half of the matches approved.
+    """
+    num_matches_per_division = NUM_PLAYERS_PER_DIVISION * (NUM_PLAYERS_PER_DIVISION - 1) // 2
+    num_matches_per_league = num_matches_per_division * NUM_DIVISIONS_PER_LEAGUE
+    db.execute(
+        (
+            "INSERT INTO bench_match_info ("
+            "user_1_id, user_2_id, league_id, division_id, score_user_1, score_user_2, "
+            "status, deadline) "
+            "SELECT (i / %(per_league)s) * 100 + (i %% %(per_league)s) %% 100, "
+            "(i / %(per_league)s) * 100 + (i * 7 + 1) %% 100, "
+            "i / %(per_league)s, (i %% %(per_league)s) / %(per_division)s + 1, "
+            "i %% 6, (i / 6) %% 6, "
+            "CASE WHEN i %% 2 = 0 THEN 'approved' ELSE 'pending_approval' END, "
+            "CURRENT_DATE + ((i %% %(per_division)s) / 10 - 10) * 7 "
+            "FROM generate_series(0, %(num_rows)s - 1) AS i;"
+        ),
+        values={
+            "per_league": num_matches_per_league,
+            "per_division": num_matches_per_division,
+            "num_rows": num_rows
+        }
+    )
+    db.execute("ANALYZE bench_match_info;")
+
+def explain_hot_queries(league_id, user_id):
+    """
+    :return: ``list[tuple]``
+
+    For each query in ``HOT_QUERIES``, the description, the plan's node types
+    and the execution time in milliseconds
+    """
+    results = []
+    for description, query in HOT_QUERIES:
+        plan = db.execute(
+            "EXPLAIN (ANALYZE, FORMAT JSON) " + query,
+            values={"league_id": league_id, "user_id": user_id}
+        ).fetchone()[0][0]
+
+        node_types, nodes = [], [plan["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            node_types.append(node["Node Type"])
+            nodes.extend(node.get("Plans", []))
+        results.append((description, node_types, plan["Execution Time"]))
+    return results
+
+def benchmark(num_rows):
+    """
+    Print the plans of the hot queries on ``num_rows`` matches, before and
+    after creating the indexes.
+    """
+    with db.transaction():
+        db.execute(
+            "CREATE TEMPORARY TABLE bench_match_info (LIKE match_info INCLUDING DEFAULTS) "
+            "ON COMMIT DROP;"
+        )
+        start_time = monotonic()
+        seed_matches(num_rows)
+        print("\n{:,} matches (seeded in {:.1f}s)".format(num_rows, monotonic() - start_time))
+
+        # Pick a league and a player in the middle of the table
+        league_id = db.execute(
+            "SELECT league_id FROM bench_match_info ORDER BY match_id OFFSET %s LIMIT 1;",
+            values=[num_rows // 2]
+        ).fetchone()["league_id"]
+        user_id = league_id * 100 + 42
+
+        before = explain_hot_queries(league_id, user_id)
+        for name, definition in db_model.MATCH_INFO_INDEXES:
+            db.execute("CREATE INDEX bench_{} ON bench_match_info {};".format(name, definition))
+        db.execute("ANALYZE bench_match_info;")
+        after = explain_hot_queries(league_id, user_id)
+
+        for (description, plan_before, ms_before), (_, plan_after, ms_after) in zip(before, after):
+            print("  {}".format(description))
+            print("    without indexes: {:>9.2f} ms  {}".format(ms_before, " > ".join(plan_before)))
+            print("    with indexes:    {:>9.2f} ms  {}".format(ms_after, " > ".join(plan_after)))
+
+if __name__ == "__main__":
+    table_sizes = [int(x) for x in sys.argv[1:]] or [10000, 100000, 1000000, 3000000]
+    for table_size in table_sizes:
+        benchmark(table_size)
+    db.disconnect()
@@ -0,0 +1,94 @@
+"""
+benchmark_session_size.py
+
+Compare how many bytes the session adds to each request (``Cookie``) and
+response (``Set-Cookie``) with Flask's cookie sessions and with the server-side
+session stores in ``tiger_leagues.sessions``.
+
+The session holds a profile shaped like ``user_model.get_user``'s, for a user
+in a few leagues with a growing number of unread notifications. Usage:
+
+    python benchmark_session_size.py [cookie|sqlite|postgres ...]
+
+"""
+
+import sys
+sys.path.insert(0, "..")
+
+from datetime import datetime, timezone
+from time import monotonic
+
+from tiger_leagues import create_app
+
+BROWSER_COOKIE_LIMIT = 4093
+
+def fake_user_profile(num_leagues, num_notifications):
+    """
+    :return: ``dict``
+
+    A profile with the same keys as the ones returned by ``user_model.get_user``
+    """
+    associated_leagues = {
+        league_id: {
+            "league_id": league_id, "league_name": "Simulated League {}".format(league_id),
+            "status": "member", "division_id": 1
+        } for league_id in range(1, num_leagues + 1)
+    }
+    return {
+        "user_id": 1, "name": "Simulated User", "net_id": "simuser",
+        "email": "simuser@princeton.edu", "phone_num": "555-555-5555",
+        "room": "Blair A43", "associated_leagues": associated_leagues,
+        "league_ids": list(associated_leagues.keys()),
+        "unread_notifications": [
+            {
+                "notification_id": i, "user_id": 1, "league_id": 1 + i % num_leagues,
+                "notification_status": "delivered",
+                "notification_text": "Score approved: u{} {} - {} u{}".format(i, i % 5, i % 3, i + 1),
+                "created_at": datetime.now(timezone.utc),
+                "league_name": "Simulated League {}".format(1 + i % num_leagues)
+            } for i in range(num_notifications)
+        ]
+    }
+
+def measure(app, user_profile):
+    """
+    :return: ``tuple(int, int, float)``
+
+    The sizes of the ``Set-Cookie`` and ``Cookie`` headers, in bytes, and the
+    time that it took to save and re-open the session, in milliseconds
+    """
+    interface = app.session_interface
+    start_time = monotonic()
+    with app.test_request_context("/") as context:
+        session = interface.open_session(app, context.request)
+        session["user"] = user_profile
+        session["net_id"] = user_profile["net_id"]
+        response = app.response_class()
+        interface.save_session(app, session, response)
+
+    set_cookie_header = response.headers.get("Set-Cookie", "")
+    cookie_header = set_cookie_header.split(";")[0]
+    with app.test_request_context("/", headers={"Cookie": cookie_header}) as context:
+        reopened_session = interface.open_session(app, context.request)
+        assert reopened_session["net_id"] == user_profile["net_id"]
+    elapsed_ms = (monotonic() - start_time) * 1000
+
+    return len(set_cookie_header), len(cookie_header), elapsed_ms
+
+if __name__ == "__main__":
+    store_names = sys.argv[1:] or ["cookie", "sqlite", "postgres"]
+    for store_name in store_names:
+        app = create_app({"SESSION_STORE": store_name, "SECRET_KEY": "benchmark"})
+
+        print("\nSession store: {}".format(store_name))
+        print("  {:>13}  {:>17}  {:>14}  {:>8}".format(
+            "notifications", "Set-Cookie bytes", "Cookie bytes", "ms"
+        ))
+        for num_notifications in [0, 10, 50, 100, 500]:
+            set_cookie_size, cookie_size, elapsed_ms = measure(
+                app, fake_user_profile(5, num_notifications)
+            )
+            print("  {:>13}  {:>17}  {:>14}  {:>8.2f}{}".format(
+                num_notifications, set_cookie_size, cookie_size, elapsed_ms,
+                "  (over the browser limit)" if cookie_size > BROWSER_COOKIE_LIMIT else ""
+            ))
@@ -0,0 +1,58 @@
+"""
+benchmark_start_league.py
+
+Time ``admin_model.generate_league_fixtures`` on a league with many divisions, 
+with the divisions generated one after another and by a pool of worker 
+processes. Either way, the fixtures are streamed into ``match_info`` with a 
+single COPY, in the same transaction that assigns the divisions, notifies the 
+players and initializes the standings.
+
+Warning: this drops all the tables first, like ``clean_database.py``. Usage:
+
+    python benchmark_start_league.py [num_divisions [num_players_per_division [num_runs [num_workers ...]]]]
+
+"""
+
+import sys
+sys.path.insert(0, "..")
+
+from time import monotonic
+from datetime import date
+
+from tiger_leagues.models import admin_model, db_model
+from dev_scripts.clean_database import clean_database
+from dev_scripts import simulate_tiger_leagues as sim
+
+db = db_model.db
+
+if __name__ == "__main__":
+    num_divisions = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    num_players_per_division = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    num_runs = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    worker_counts = [int(x) for x in sys.argv[4:]] or [1, 4]
+
+    clean_database()
+    users = sim.register_fake_users(num_users=num_divisions * num_players_per_division)
+    league_info = sim.create_league(users[0])
+    sim.enroll_members(league_info, users[1:])
+    divisions = {
+        division_id: [
+            {"user_id": user["user_id"], "name": user["name"]} 
+            for user in users[division_id - 1::num_divisions]
+        ] for division_id in range(1, num_divisions + 1)
+    }
+
+    print("\n{} divisions of {} players".format(num_divisions, num_players_per_division))
+    # The worker counts take turns, so that they share any drift in the timings
+    for _ in range(num_runs):
+        for num_workers in worker_counts:
+            start_time = monotonic()
+            results = admin_model.generate_league_fixtures(
+                league_info["league_id"], divisions, start_date=date.today(), 
+                num_workers=num_workers
+            )
+            print("  {:>2} worker(s): {:>8.0f} ms, {} matches".format(
+                num_workers, (monotonic() - start_time) * 1000, 
+                sum(results["match_counts"].values())
+            ))
+    db.disconnect()
@@ -9,7 +9,7 @@ changes.
 import sys
 sys.path.insert(0, "..")
 
-from tiger_leagues.models import db_model as database
+from tiger_leagues.models import db_model as database, user_model
 
 def clean_database():
     """
@@ -17,7 +17,7 @@ def clean_database():
 
     @returns `bool`: `True` if the operation was successful.
     """
-    db = database.Database()
+    db = database.db
     cursor = db.execute((
         "SELECT tablename FROM pg_catalog.pg_tables "
         "WHERE schemaname != 'pg_catalog' AND schemaname != 'information_schema';"
@@ -31,6 +31,8 @@ def clean_database():
     )
 
     db.launch()
+    # The cached profiles refer to users that no longer exist
+    user_model.profile_cache.invalidate()
 
     return True
 
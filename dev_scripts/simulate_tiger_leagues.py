@@ -14,7 +14,7 @@ from math import ceil
 
 from tiger_leagues.models import user_model, league_model, admin_model, db_model
 
-db = db_model.Database()
+db = db_model.db
 
 def register_fake_users(num_users=40):
     """
@@ -117,7 +117,7 @@ def enroll_members(league_info, player_profiles, status=league_model.STATUS_MEMB
 
     return player_profiles
 
-def generate_divisions_and_fixtures(league_info, desired_fixtures_config=None):
+def generate_divisions_and_fixtures(league_info, desired_fixtures_config=None, num_legs=1):
     """
     Generate the matches for the provided league.
 
@@ -131,6 +131,14 @@ def generate_divisions_and_fixtures(league_info, desired_fixtures_config=None):
 
     Expected keys: ``start_date``, ``completion_deadline``
 
+    :kwarg num_legs: int
+
+    The number of times that each pair of players in a division should meet
+
+    :return: ``dict``
+
+    The results of ``admin_model.generate_league_fixtures``
+
     """
     start_date = date.fromisoformat(league_info["registration_deadline"]) - timedelta(weeks=4)
     if desired_fixtures_config is None:
@@ -151,10 +159,12 @@ def generate_divisions_and_fixtures(league_info, desired_fixtures_config=None):
     )["message"]["divisions"]
 
     results = admin_model.generate_league_fixtures(
-        league_info["league_id"], league_divisions, start_date=start_date
+        league_info["league_id"], league_divisions, start_date=start_date, 
+        num_legs=num_legs
     )
     if results["message"] != "Fixtures successfully created!":
         raise RuntimeError(results["message"])
+    return results
 
 def simulate_matches(league_id, admin_user_id, deadline=None, matches=None, by_admin=True):
     """
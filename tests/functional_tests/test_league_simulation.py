@@ -8,7 +8,7 @@ sys.path.insert(0, "../..")
 from dev_scripts import simulate_tiger_leagues as sim
 from tiger_leagues.models import db_model, league_model
 
-db = db_model.Database()
+db = db_model.db
 
 def test_simulation(cleanup):
     # Check that many users can be added
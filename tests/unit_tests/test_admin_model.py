@@ -6,9 +6,12 @@ import sys
 sys.path.insert(0, "../..")
 sys.path.insert(0, "../")
 
+from collections import defaultdict
+from datetime import date, timedelta
+
 import pytest
 
-from tiger_leagues.models import admin_model, league_model
+from tiger_leagues.models import admin_model, league_model, user_model
 from tiger_leagues.models.exception import TigerLeaguesException
 from dev_scripts import simulate_tiger_leagues as sim
 
@@ -54,3 +57,264 @@ def test_league_must_have_at_least_one_admin(cleanup):
         league_info["league_id"],
         {fake_user["user_id"]: league_model.STATUS_ADMIN}
     )["message"][fake_user["user_id"]]
+
+def test_double_round_robin_alternates_home_and_away(cleanup):
+    fake_users = sim.register_fake_users(num_users=9)
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:])
+    league_info["num_active_players"] = len(fake_users)
+
+    results = sim.generate_divisions_and_fixtures(league_info, num_legs=2)
+    cursor = admin_model.db.execute(
+        "SELECT division_id, user_1_id, user_2_id FROM match_info WHERE league_id = %s;",
+        values=[league_info["league_id"]]
+    )
+    fixtures = defaultdict(list)
+    for row in cursor:
+        fixtures[row["division_id"]].append((row["user_1_id"], row["user_2_id"]))
+
+    for division_id, matches in fixtures.items():
+        assert len(matches) == results["match_counts"][division_id]
+        assert len(set(matches)) == len(matches)
+        # Each pair meets twice, once at each player's home
+        assert all((user_2_id, user_1_id) in matches for user_1_id, user_2_id in matches)
+
+def test_regenerated_fixtures_replace_the_previous_ones(cleanup):
+    fake_users = sim.register_fake_users(num_users=24)
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:])
+    league_id = league_info["league_id"]
+
+    start_date = date.today()
+    divisions = {
+        division_id: [
+            {"user_id": user["user_id"], "name": user["name"]} 
+            for user in fake_users[division_id - 1::3]
+        ] for division_id in range(1, 4)
+    }
+
+    def fetch_fixtures():
+        return sorted(
+            tuple(row) for row in admin_model.db.execute(
+                (
+                    "SELECT division_id, user_1_id, user_2_id, deadline FROM match_info "
+                    "WHERE league_id = %s;"
+                ),
+                values=[league_id]
+            )
+        )
+
+    first_results = admin_model.generate_league_fixtures(
+        league_id, divisions, start_date=start_date, num_workers=1
+    )
+    first_fixtures = fetch_fixtures()
+    # The divisions are generated by worker processes this time
+    second_results = admin_model.generate_league_fixtures(
+        league_id, divisions, start_date=start_date, num_workers=3
+    )
+
+    assert second_results == first_results
+    assert fetch_fixtures() == first_fixtures
+    assert len(first_fixtures) == sum(first_results["match_counts"].values()) == 3 * (8 * 7 // 2)
+    standings = league_model.get_league_standings(league_id)
+    assert sum(len(x) for x in standings.values()) == len(fake_users)
+
+def test_divisions_keep_players_with_the_same_answers_together(cleanup):
+    fake_users = sim.register_fake_users(num_users=24)
+    league_info = sim.create_league(fake_users[0], league_config={
+        "league_name": "Grouped League", "description": "Same console, same division",
+        "points_per_win": 3, "points_per_draw": 1, "points_per_loss": 0,
+        "max_num_players": 30, "num_games_per_period": 1, "length_period_in_days": 1,
+        "registration_deadline": (date.today() + timedelta(weeks=1)).isoformat(),
+        "additional_questions": {
+            "question0": {"question": "Which console do you have?", "options": "A, B, C"}
+        }
+    })
+    league_id = league_info["league_id"]
+
+    answers = {fake_users[0]["user_id"]: ""} # The creator never answered
+    for idx, fake_user in enumerate(fake_users[1:]):
+        answers[fake_user["user_id"]] = "A" if idx < 10 else ("B" if idx < 17 else "C")
+        league_model.process_join_league_request(
+            league_id, fake_user, {"question0": answers[fake_user["user_id"]]}
+        )
+    admin_model.update_join_league_requests(
+        league_id, {user["user_id"]: league_model.STATUS_MEMBER for user in fake_users[1:]}
+    )
+
+    allocation_config = {
+        "start_date": date.today().isoformat(),
+        "completion_deadline": (date.today() + timedelta(days=7)).isoformat(),
+        "group_by": ["question9"]
+    }
+    assert not admin_model.allocate_league_divisions(league_id, allocation_config)["success"]
+
+    allocation_config["group_by"] = ["question0"]
+    divisions = admin_model.allocate_league_divisions(
+        league_id, allocation_config
+    )["message"]["divisions"]
+    division_sizes = [len(players) for players in divisions.values()]
+    assert len(divisions) == 3 and max(division_sizes) - min(division_sizes) <= 1
+    assert sorted(
+        player["user_id"] for players in divisions.values() for player in players
+    ) == sorted(answers)
+
+    # Each boundary between two divisions splits at most one group of answers
+    division_answers = {
+        (division_id, answers[player["user_id"]]) 
+        for division_id, players in divisions.items() for player in players
+    }
+    assert len(division_answers) <= len(divisions) + len(set(answers.values())) - 1
+
+def test_divisions_can_be_seeded_by_past_results(cleanup):
+    fake_users = sim.register_fake_users(num_users=13)
+    past_league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(past_league_info, fake_users[1:12])
+    past_league_info["num_active_players"] = 12
+    sim.generate_divisions_and_fixtures(past_league_info)
+    # The higher the user ID, the better the player did. The last user is new.
+    admin_model.db.execute(
+        "UPDATE league_standings SET games_played = 10, points = user_id WHERE league_id = %s;",
+        values=[past_league_info["league_id"]]
+    )
+    newcomer_id = fake_users[12]["user_id"]
+    ranked_user_ids = sorted(
+        (user["user_id"] for user in fake_users[:12]), reverse=True
+    ) + [newcomer_id]
+
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:])
+    allocation_config = {
+        "num_games_per_period": 1, "length_period_in_days": 1,
+        "start_date": date.today().isoformat(),
+        "completion_deadline": (date.today() + timedelta(days=3)).isoformat(),
+        "seeding": "tiers"
+    }
+    divisions = admin_model.allocate_league_divisions(
+        league_info["league_id"], allocation_config
+    )["message"]["divisions"]
+    assert [len(players) for players in divisions.values()] == [5, 4, 4]
+    assert [
+        player["user_id"] for division_id in sorted(divisions) 
+        for player in divisions[division_id]
+    ] == ranked_user_ids
+
+    allocation_config["seeding"] = "snake"
+    divisions = admin_model.allocate_league_divisions(
+        league_info["league_id"], allocation_config
+    )["message"]["divisions"]
+    division_of = {
+        player["user_id"]: division_id 
+        for division_id, players in divisions.items() for player in players
+    }
+    assert [division_of[user_id] for user_id in ranked_user_ids] == [
+        1, 2, 3, 3, 2, 1, 1, 2, 3, 3, 2, 1, 1
+    ]
+
+    allocation_config["group_by"] = ["question0"]
+    assert not admin_model.allocate_league_divisions(
+        league_info["league_id"], allocation_config
+    )["success"]
+
+def test_join_requests_are_updated_in_constant_statements(cleanup):
+    def num_statements_to_update(league_id, league_statuses):
+        num_statements = admin_model.db.statement_count()
+        results = admin_model.update_join_league_requests(league_id, league_statuses)
+        return results["message"], admin_model.db.statement_count() - num_statements
+
+    fake_users = sim.register_fake_users(num_users=41)
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:], status=league_model.STATUS_PENDING)
+
+    _, num_statements_for_one = num_statements_to_update(
+        league_info["league_id"], {fake_users[1]["user_id"]: league_model.STATUS_MEMBER}
+    )
+    user_id_to_status, num_statements_for_many = num_statements_to_update(
+        league_info["league_id"], 
+        {user["user_id"]: league_model.STATUS_MEMBER for user in fake_users[1:]}
+    )
+    assert num_statements_for_many == num_statements_for_one
+    assert set(user_id_to_status.values()) == {league_model.STATUS_MEMBER}
+    assert admin_model.get_registration_stats(league_info["league_id"])[league_model.STATUS_MEMBER] == 40
+
+def test_fixtures_are_bulk_inserted_per_division(cleanup):
+    fake_users = sim.register_fake_users(num_users=12)
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:])
+    league_info["num_active_players"] = len(fake_users)
+
+    results = sim.generate_divisions_and_fixtures(league_info)
+    assert results["match_counts"]
+
+    cursor = admin_model.db.execute(
+        (
+            "SELECT division_id, COUNT(*) FROM match_info "
+            "WHERE league_id = %s GROUP BY division_id;"
+        ),
+        values=[league_info["league_id"]]
+    )
+    stored_counts = {row["division_id"]: row["count"] for row in cursor}
+    assert stored_counts == results["match_counts"]
+
+def test_deleting_a_league_removes_all_its_rows(cleanup):
+    fake_users = sim.register_fake_users(num_users=12)
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:])
+    league_info["num_active_players"] = len(fake_users)
+    sim.generate_divisions_and_fixtures(league_info)
+    league_id = league_info["league_id"]
+
+    results = admin_model.delete_league(league_id)
+    assert results["success"]
+
+    for table_name in ["league_info", "league_memberships", "match_info", "league_standings"]:
+        assert admin_model.db.execute(
+            "SELECT COUNT(*) FROM {} WHERE league_id = %s;".format(table_name), 
+            values=[league_id]
+        ).fetchone()[0] == 0
+    notifications = user_model.read_notifications(fake_users[1]["user_id"])
+    assert [x["league_id"] for x in notifications] == [None]
+    assert user_model.get_user(fake_users[1]["net_id"])["league_ids"] == []
+
+    with pytest.raises(TigerLeaguesException):
+        admin_model.delete_league(league_id)
+
+def test_current_matches_are_paged_per_division(cleanup):
+    fake_users = sim.register_fake_users(num_users=12)
+    league_info = sim.create_league(fake_users[0])
+    sim.enroll_members(league_info, fake_users[1:])
+    league_info["num_active_players"] = len(fake_users)
+    # The fixtures start 4 weeks before this, so every division has due matches
+    league_info["registration_deadline"] = (date.today() - timedelta(weeks=4)).isoformat()
+    sim.generate_divisions_and_fixtures(league_info)
+    names = {user["user_id"]: user["name"] for user in fake_users}
+
+    num_statements = admin_model.db.statement_count()
+    all_matches = admin_model.get_current_matches(league_info["league_id"])
+    assert admin_model.db.statement_count() - num_statements == 1
+    assert all_matches
+
+    first_pages = admin_model.get_current_matches(league_info["league_id"], page_size=2)
+    second_pages = admin_model.get_current_matches(league_info["league_id"], page=2, page_size=2)
+    for division_id, division in all_matches.items():
+        matches = division["matches"]
+        assert division["num_matches"] == len(matches)
+        assert [m["match_id"] for m in first_pages[division_id]["matches"]] == \
+            [m["match_id"] for m in matches[-2:]]
+        assert [m["match_id"] for m in second_pages[division_id]["matches"]] == \
+            [m["match_id"] for m in matches[-4:-2]]
+        assert second_pages[division_id]["num_matches"] == len(matches)
+        for match in matches:
+            assert match["user_1_name"] == names[match["user_1_id"]]
+            assert match["user_2_name"] == names[match["user_2_id"]]
+
+    # Divisions with no matches that far back are still listed, with their count
+    num_matches = max(division["num_matches"] for division in all_matches.values())
+    last_pages = admin_model.get_current_matches(
+        league_info["league_id"], page=num_matches + 1, page_size=1
+    )
+    assert list(last_pages) == list(all_matches)
+    assert all(
+        not division["matches"] and division["num_matches"] == all_matches[division_id]["num_matches"]
+        for division_id, division in last_pages.items()
+    )
@@ -0,0 +1,124 @@
+"""
+test_db_model.py
+"""
+
+import os
+import sys
+sys.path.insert(0, "../..")
+
+from threading import Thread
+
+import pytest
+from psycopg2 import pool
+
+from tiger_leagues.models import db_model, config
+
+def test_pool_is_bounded():
+    connection_pool = db_model.ConnectionPool(
+        config.DATABASE_URL, min_size=1, max_size=2, timeout=0.5
+    )
+    held_connections = [connection_pool.getconn(), connection_pool.getconn()]
+    assert connection_pool.stats()["in_use"] == 2
+
+    with pytest.raises(pool.PoolError):
+        connection_pool.getconn()
+    assert connection_pool.stats()["num_timeouts"] == 1
+
+    # A returned connection is reused instead of opening a third one
+    connection_pool.putconn(held_connections.pop())
+    held_connections.append(connection_pool.getconn())
+    stats = connection_pool.stats()
+    assert stats["in_use"] == 2 and stats["idle"] == 0
+
+    for connection in held_connections:
+        connection_pool.putconn(connection)
+    connection_pool.closeall()
+
+def test_concurrent_queries_share_the_pool():
+    db = db_model.Database(min_pool_size=0, max_pool_size=3, pool_timeout=10)
+    results = []
+
+    def run_query(i):
+        results.append(db.execute("SELECT pg_sleep(0.1), %s AS i;", values=[i]).fetchone()["i"])
+
+    threads = [Thread(target=run_query, args=(i,)) for i in range(10)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    assert sorted(results) == list(range(10))
+    stats = db.pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] <= 3
+    assert stats["num_checkouts"] >= 10
+    assert stats["num_waits"] > 0
+    db.disconnect()
+
+def test_database_connects_lazily():
+    db = db_model.Database()
+    assert db.pool_stats() is None
+    assert db.execute("SELECT 1 AS one;").fetchone()["one"] == 1
+    assert db.pool_stats() is not None
+    db.disconnect()
+
+def test_forked_process_opens_its_own_connections():
+    db = db_model.Database()
+    parent_backend = db.execute("SELECT pg_backend_pid() AS pid;").fetchone()["pid"]
+
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            child_backend = db.execute("SELECT pg_backend_pid() AS pid;").fetchone()["pid"]
+            exit_code = 0 if child_backend != parent_backend else 1
+        finally:
+            os._exit(exit_code)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    # The parent's connection should have survived the child's exit
+    assert db.execute("SELECT pg_backend_pid() AS pid;").fetchone()["pid"] == parent_backend
+    db.disconnect()
+
+def test_transaction_commits_once_at_the_end(cleanup):
+    db = db_model.db
+    with db.transaction():
+        db.execute("INSERT INTO users (net_id) VALUES (%s);", values=["in_transaction"])
+        # Other connections can't see the row until the transaction commits
+        other_db = db_model.Database()
+        assert other_db.execute(
+            "SELECT COUNT(*) FROM users WHERE net_id = %s;", values=["in_transaction"]
+        ).fetchone()["count"] == 0
+        other_db.disconnect()
+
+    assert db.execute(
+        "SELECT COUNT(*) FROM users WHERE net_id = %s;", values=["in_transaction"]
+    ).fetchone()["count"] == 1
+
+def test_transaction_rolls_back_atomically(cleanup):
+    db = db_model.db
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.execute("INSERT INTO users (net_id) VALUES (%s);", values=["rolled_back_1"])
+            with db.transaction():
+                db.execute("INSERT INTO users (net_id) VALUES (%s);", values=["rolled_back_2"])
+            raise RuntimeError("Abort the transaction")
+
+    assert db.execute(
+        "SELECT COUNT(*) FROM users WHERE net_id LIKE 'rolled_back_%%';"
+    ).fetchone()["count"] == 0
+
+def test_schema_migrations_are_applied_once(cleanup):
+    db = db_model.db
+    applied_versions = [
+        row["version"] for row in db.execute("SELECT version FROM schema_migrations ORDER BY version;")
+    ]
+    assert applied_versions == [version for version, _, _ in db_model.SCHEMA_MIGRATIONS]
+    assert db.migrate() == []
+
+    index_names = {
+        row["indexname"] for row in db.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'match_info';"
+        )
+    }
+    for name, _ in db_model.MATCH_INFO_INDEXES:
+        assert name in index_names
@@ -31,6 +31,8 @@ def check_fixtures(players):
     fixtures = admin_model.fixture_generator(players)
     # for fixture in fixtures: print(fixture)
     expected_games = N - 1 if N >= 1 else N
+    # An odd number of players needs N rounds, one bye each, to play every pairing
+    if N > 1 and N % 2 == 1: expected_games = N
     assert len(fixtures) == expected_games, "Expected {} sets of games; received {}".format(expected_games, len(fixtures))
 
     not_yet_played = set()
@@ -77,3 +79,18 @@ def test_three_players():
 
 def test_single_player():
     assert check_fixtures([0])
+
+def test_rounds_can_be_computed_independently():
+    players = list(range(101))
+    for round_index, current_matches in enumerate(admin_model.iter_fixture_rounds(players)):
+        assert admin_model.fixture_round(players, round_index) == current_matches
+
+def test_odd_divisions_play_every_pairing():
+    # With an odd number of players, everyone sits out one of the N rounds
+    for N in [3, 9, 101]:
+        fixtures = admin_model.fixture_generator(list(range(N)))
+        assert len(fixtures) == N, "Expected {} sets of games; received {}".format(N, len(fixtures))
+
+        all_pairings = [frozenset(pairing) for current_matches in fixtures for pairing in current_matches]
+        assert len(all_pairings) == len(set(all_pairings)) == N * (N - 1) // 2, \
+            "Every pair of players should meet exactly once"
@@ -10,11 +10,11 @@ from datetime import date, timedelta
 import pytest
 
 sys.path.insert(0, "../..")
-from tiger_leagues.models import league_model, db_model, admin_model, exception
+from tiger_leagues.models import league_model, db_model, admin_model, user_model, exception
 from tiger_leagues.models.exception import TigerLeaguesException
 from dev_scripts import simulate_tiger_leagues as sim
 
-db = db_model.Database()
+db = db_model.db
 
 def create_and_play_league(num_players=20):
     fake_users = sim.register_fake_users(num_users=num_players)
@@ -106,6 +106,62 @@ def test_league_standings(cleanup):
     )[last_place_stats["division_id"]][-1]
     assert ranking_on_table["user_id"] == last_place_stats["user_id"]
 
+def test_incremental_standings_match_full_recomputation(cleanup):
+    test_league, _, admin_user = create_and_play_league(num_players=12)
+    league_id = test_league["league_id"]
+
+    # Correct a previously approved score, and dispute another one
+    matches = db.execute(
+        "SELECT * FROM match_info WHERE league_id = %s ORDER BY match_id;", 
+        values=[league_id]
+    ).fetchall()
+    admin_model.approve_match({
+        "score_user_1": matches[0]["score_user_2"] + 3, 
+        "score_user_2": matches[0]["score_user_1"],
+        "match_id": matches[0]["match_id"]
+    }, admin_user["user_id"])
+    league_model.process_player_score_report(matches[1]["user_1_id"], {
+        "my_score": matches[1]["score_user_1"] + 1, 
+        "opponent_score": matches[1]["score_user_2"],
+        "match_id": matches[1]["match_id"]
+    })
+
+    columns = league_model.STANDINGS_COUNTERS + ["rank"]
+    def snapshot():
+        return {
+            row["user_id"]: [row[column] for column in columns]
+            for division in league_model.get_league_standings(league_id).values()
+            for row in division
+        }
+
+    incremental_standings = snapshot()
+    for division_id in {match["division_id"] for match in matches}:
+        league_model.update_league_standings(league_id, division_id)
+    assert incremental_standings == snapshot()
+
+def test_aggregated_standings_match_python_standings(cleanup):
+    test_league, _, _ = create_and_play_league(num_players=12)
+    league_id = test_league["league_id"]
+
+    division_ids = [
+        row["division_id"] for row in db.execute(
+            "SELECT DISTINCT division_id FROM match_info WHERE league_id = %s;",
+            values=[league_id]
+        )
+    ]
+    columns = league_model.STANDINGS_COUNTERS + ["rank", "user_id"]
+    for division_id in division_ids:
+        python_standings = league_model.update_league_standings(league_id, division_id)
+        aggregated_standings = league_model.update_league_standings(
+            league_id, division_id, aggregate_in_database=True
+        )
+        assert python_standings.keys() == aggregated_standings.keys()
+        for user_id, standing in python_standings.items():
+            assert [standing[c] for c in columns] == \
+                [aggregated_standings[user_id][c] for c in columns]
+            # Nothing changed between the two computations
+            assert aggregated_standings[user_id]["rank_delta"] == 0
+
 def test_league_standings_of_nonexistent_league(cleanup):
     assert league_model.get_league_standings(-1) == {}
 
@@ -186,4 +242,75 @@ def test_create_league_in_the_past():
     with pytest.raises(TigerLeaguesException):
         league_model.create_league(base_league_info, 1)
     base_league_info["registration_deadline"] = (date.today()).isoformat()
-    
\ No newline at end of file
+    
+def test_league_responses_are_stored_per_membership(cleanup):
+    admin_user, player = sim.register_fake_users(num_users=2)
+    league_config = sim.create_league(admin_user)
+    league_id = league_config["league_id"]
+    db.execute(
+        "UPDATE league_info SET additional_questions = %s WHERE league_id = %s;",
+        values=['{"question0": {"question": "Position?", "options": "GK, DEF"}}', league_id]
+    )
+    league_info = league_model.get_league_info(league_id)
+
+    player = league_model.process_join_league_request(
+        league_id, player, {"question0": "GK"}
+    )["message"]
+    player = user_model.get_user(player["net_id"])
+    assert league_model.get_previous_responses(league_id, player)["question0"] == "GK"
+
+    league_model.process_update_league_responses(league_id, player, {"question0": "DEF"})
+    join_requests = {
+        join_request["user_id"]: join_request 
+        for join_request in admin_model.get_join_league_requests(league_info["league_id"])
+    }
+    assert join_requests[player["user_id"]]["question0"] == "DEF"
+    assert join_requests[player["user_id"]]["status"] == league_model.STATUS_PENDING
+    assert join_requests[admin_user["user_id"]]["status"] == league_model.STATUS_ADMIN
+
+def test_opponent_names_are_fetched_with_the_matches(cleanup):
+    test_league, fake_users, _ = create_and_play_league(num_players=12)
+    player = fake_users[0]
+    names = {user["user_id"]: user["name"] for user in fake_users}
+
+    num_statements = db.statement_count()
+    all_matches = league_model.get_players_current_matches(
+        player["user_id"], test_league["league_id"], 
+        num_periods_before=inf, num_periods_after=inf
+    )
+    num_statements_for_season = db.statement_count() - num_statements
+
+    num_statements = db.statement_count()
+    league_model.get_players_current_matches(
+        player["user_id"], test_league["league_id"], 
+        num_periods_before=0, num_periods_after=0
+    )
+    assert db.statement_count() - num_statements == num_statements_for_season
+
+    assert len(all_matches) > 1
+    for match in all_matches:
+        if match["opponent_id"] in names:
+            assert match["opponent_name"] == names[match["opponent_id"]]
+        assert match["recent_updater_name"] is not None
+
+def test_current_window_is_fetched_in_one_query(cleanup):
+    test_league, _, admin_user = create_and_play_league(num_players=12)
+    league_info = sim.create_league(admin_user)
+    assert league_model.get_matches_in_current_window(league_info["league_id"]) == []
+    with pytest.raises(TigerLeaguesException):
+        league_model.get_matches_in_current_window(league_info["league_id"] + 1)
+
+    for num_periods in [0, 3, inf]:
+        num_statements = db.statement_count()
+        matches = league_model.get_matches_in_current_window(
+            test_league["league_id"], num_periods_before=num_periods, 
+            num_periods_after=num_periods
+        )
+        assert db.statement_count() - num_statements == 1
+        assert all(match["league_id"] == test_league["league_id"] for match in matches)
+
+    all_matches = db.execute(
+        "SELECT match_id FROM match_info WHERE league_id = %s;", 
+        values=[test_league["league_id"]]
+    ).fetchall()
+    assert len(matches) == len(all_matches)
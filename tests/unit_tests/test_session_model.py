@@ -0,0 +1,74 @@
+"""
+test_session_model.py
+"""
+
+import sys
+sys.path.insert(0, "../..")
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+from itsdangerous import Signer
+
+from tiger_leagues import sessions
+from tiger_leagues.models import session_model
+
+@pytest.fixture(params=["postgres", "sqlite"])
+def session_store(request, cleanup, tmpdir):
+    if request.param == "postgres":
+        return session_model.PostgresSessionStore()
+    return session_model.SQLiteSessionStore(str(tmpdir.join("sessions.sqlite3")))
+
+def test_sessions_are_saved_and_deleted(session_store):
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    assert session_store.load("abc") is None
+
+    session_store.save("abc", '{"net_id":"test_netid"}', expires_at)
+    data, stored_expiry = session_store.load("abc")
+    assert data == '{"net_id":"test_netid"}'
+    assert abs((stored_expiry - expires_at).total_seconds()) < 1
+
+    session_store.save("abc", '{"net_id":"other_netid"}', expires_at)
+    assert session_store.load("abc")[0] == '{"net_id":"other_netid"}'
+
+    session_store.delete("abc")
+    assert session_store.load("abc") is None
+
+def test_expired_sessions_are_not_loaded(session_store):
+    session_store.save("old", "{}", datetime.now(timezone.utc) - timedelta(seconds=1))
+    session_store.save("new", "{}", datetime.now(timezone.utc) + timedelta(days=1))
+    assert session_store.load("old") is None
+    assert session_store.delete_expired() == 1
+    assert session_store.load("new") is not None
+
+def test_stores_must_implement_every_method():
+    class IncompleteSessionStore(session_model.SessionStore):
+        def load(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteSessionStore()
+
+def test_regenerated_sessions_discard_their_old_id(tmpdir):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    store = session_model.SQLiteSessionStore(str(tmpdir.join("sessions.sqlite3")))
+    interface = sessions.ServerSideSessionInterface(store)
+
+    # E.g. an ID that an attacker obtained, and then planted in the victim's browser
+    store.save("planted", "{}", datetime.now(timezone.utc) + timedelta(days=1))
+    cookie_value = Signer(app.secret_key, salt=interface.salt).sign(b"planted").decode("ascii")
+
+    with app.test_request_context("/", headers={"Cookie": "session=" + cookie_value}) as context:
+        session = interface.open_session(app, context.request)
+        assert session.session_id == "planted"
+        sessions.regenerate_session(session)
+        session["net_id"] = "test_netid"
+        response = app.response_class()
+        interface.save_session(app, session, response)
+
+    assert session.session_id != "planted"
+    assert store.load("planted") is None
+    assert store.load(session.session_id) is not None
+    assert "planted" not in response.headers["Set-Cookie"]
@@ -5,7 +5,12 @@ test_user_model.py
 import sys
 sys.path.insert(0, "../..")
 
-from tiger_leagues.models import user_model
+from time import sleep
+
+from tiger_leagues.models import user_model, league_model, admin_model, db_model
+from dev_scripts import simulate_tiger_leagues as sim
+
+db = db_model.db
 
 test_profile = {"name": "Test", "room": "Blair A43"}
 
@@ -28,3 +33,165 @@ def test_user_update(cleanup):
 
     assert updated_profile["user_id"] == old_profile["user_id"]
     assert updated_profile["name"] == "Test New Name"
+
+def test_league_memberships(cleanup):
+    admin_user, player = sim.register_fake_users(num_users=2)
+    league_info = sim.create_league(admin_user)
+    league_id = league_info["league_id"]
+
+    admin_profile = user_model.get_user(admin_user["net_id"])
+    assert admin_profile["league_ids"] == [league_id]
+    assert admin_profile["associated_leagues"][league_id]["status"] == league_model.STATUS_ADMIN
+
+    sim.enroll_members(league_info, [player])
+    player_profile = user_model.get_user(player["net_id"])
+    assert player_profile["associated_leagues"][league_id]["status"] == league_model.STATUS_MEMBER
+    assert {p["user_id"] for p in admin_model.get_join_league_requests(league_id)} == \
+        {admin_user["user_id"], player["user_id"]}
+
+    league_model.process_leave_league_request(league_id, player_profile)
+    player_profile = user_model.get_user(player["net_id"])
+    assert player_profile["league_ids"] == []
+    assert player_profile["associated_leagues"] == {}
+    assert admin_model.get_registration_stats(league_id)[league_model.STATUS_INACTIVE] == 1
+
+def test_fetching_a_user_costs_a_constant_number_of_queries(cleanup):
+    admin_user, player = sim.register_fake_users(num_users=2)
+
+    def num_queries_to_fetch(user):
+        num_statements = db.statement_count()
+        user_profile = user_model.get_user(user["net_id"])
+        return user_profile, db.statement_count() - num_statements
+
+    league_info = sim.create_league(admin_user)
+    sim.enroll_members(league_info, [player])
+    _, num_queries_in_one_league = num_queries_to_fetch(player)
+
+    for _ in range(14):
+        league_info = sim.create_league(admin_user)
+        sim.enroll_members(league_info, [player])
+    user_profile, num_queries_in_many_leagues = num_queries_to_fetch(player)
+
+    assert len(user_profile["associated_leagues"]) == 15
+    assert num_queries_in_many_leagues == num_queries_in_one_league
+
+def test_cached_profiles_are_invalidated_by_writes(cleanup):
+    admin_user, player = sim.register_fake_users(num_users=2)
+    user_model.get_user(player["net_id"])
+
+    hits = user_model.profile_cache.stats()["hits"]
+    num_statements = db.statement_count()
+    cached_profile = user_model.get_user(player["net_id"], use_cache=True)
+    assert db.statement_count() == num_statements
+    assert user_model.profile_cache.stats()["hits"] == hits + 1
+
+    # Callers get their own copy of the profile
+    cached_profile["name"] = "Changed in place"
+    assert user_model.get_user(player["net_id"], use_cache=True)["name"] == player["name"]
+
+    league_info = sim.create_league(admin_user)
+    sim.enroll_members(league_info, [player])
+    assert league_info["league_id"] in \
+        user_model.get_user(player["net_id"], use_cache=True)["associated_leagues"]
+
+    user_model.send_notification(
+        player["user_id"], {"league_id": None, "notification_text": "Hi"}
+    )
+    notifications = user_model.get_user(player["net_id"], use_cache=True)["unread_notifications"]
+    assert "Hi" in [x["notification_text"] for x in notifications]
+
+    misses = user_model.profile_cache.stats()["misses"]
+    user_model.update_user_profile(cached_profile, player["net_id"], {"name": "New Name"})
+    assert user_model.get_user(player["net_id"], use_cache=True)["name"] == "New Name"
+    assert user_model.profile_cache.stats()["misses"] == misses
+
+def test_profiles_read_before_a_write_are_not_cached():
+    profile_cache = user_model.ProfileCache(ttl=30)
+    user_profile = {"user_id": 1, "net_id": "test_netid", "name": "Old Name"}
+
+    # The write commits while the profile is being read
+    snapshot = profile_cache.snapshot()
+    profile_cache.invalidate(1)
+    profile_cache.put(user_profile, snapshot)
+    assert profile_cache.get(user_id=1) is None
+
+    profile_cache.put(user_profile, profile_cache.snapshot())
+    assert profile_cache.get(net_id="test_netid")["name"] == "Old Name"
+    profile_cache.invalidate(1)
+    assert profile_cache.get(net_id="test_netid") is None
+    assert profile_cache.stats()["size"] == 0
+
+def test_expired_profiles_are_evicted():
+    profile_cache = user_model.ProfileCache(ttl=0.05)
+    for user_id in range(10):
+        profile_cache.put(
+            {"user_id": user_id, "net_id": "user{}".format(user_id)}, 
+            profile_cache.snapshot()
+        )
+    assert profile_cache.stats()["size"] == 10
+    sleep(0.1)
+    assert profile_cache.get(net_id="user1") is None
+    assert profile_cache.stats()["size"] == 0
+
+def test_profiles_read_in_a_transaction_are_not_cached(cleanup):
+    player = sim.register_fake_users(num_users=1)[0]
+    user_model.profile_cache.invalidate()
+    with db.transaction():
+        user_model.get_user(player["net_id"])
+    assert user_model.profile_cache.get(net_id=player["net_id"]) is None
+
+def test_only_a_preview_of_unread_notifications_is_fetched(cleanup):
+    player = sim.register_fake_users(num_users=1)[0]
+    num_notifications = user_model.NOTIFICATION_PREVIEW_SIZE * 3
+    for i in range(num_notifications):
+        user_model.send_notification(
+            player["user_id"], {"league_id": None, "notification_text": str(i)}
+        )
+    user_model.update_notification_status(player["user_id"], {
+        "notification_id": user_model.read_notifications(player["user_id"], page_size=1)[0]["notification_id"],
+        "notification_status": user_model.NOTIFICATION_STATUS_SEEN
+    })
+
+    user_profile = user_model.get_user(player["net_id"])
+    assert user_profile["num_unread_notifications"] == num_notifications - 1
+    preview = user_profile["unread_notifications"]
+    assert len(preview) == user_model.NOTIFICATION_PREVIEW_SIZE
+    assert [x["created_at"] for x in preview] == \
+        sorted([x["created_at"] for x in preview], reverse=True)
+    assert {x["league_name"] for x in preview} == {"[Tiger Leagues]"}
+
+def test_notifications_are_paginated_by_keyset(cleanup):
+    admin_user, player = sim.register_fake_users(num_users=2)
+    league_info = sim.create_league(admin_user)
+    for i in range(7):
+        user_model.send_notification(player["user_id"], {
+            "league_id": league_info["league_id"] if i % 2 else None,
+            "notification_text": str(i)
+        })
+    all_notifications = user_model.read_notifications(player["user_id"])
+    assert [x["notification_text"] for x in all_notifications] == \
+        [str(i) for i in reversed(range(7))]
+
+    pages, before = [], None
+    while True:
+        page = user_model.read_notifications(player["user_id"], before=before, page_size=3)
+        if not page: break
+        pages.append(page)
+        before = (page[-1]["created_at"], page[-1]["notification_id"])
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [x for page in pages for x in page] == all_notifications
+    assert {x["league_name"] for x in all_notifications} == \
+        {"[Tiger Leagues]", league_info["league_name"]}
+
+def test_notifications_are_sent_in_bulk(cleanup):
+    players = sim.register_fake_users(num_users=150)
+    num_statements = db.statement_count()
+    notification_ids = user_model.send_notifications([
+        {"user_id": player["user_id"], "league_id": None, "notification_text": "Hi"}
+        for player in players
+    ])
+    assert db.statement_count() - num_statements == 1
+    assert len(set(notification_ids)) == len(players)
+    assert user_model.get_user(players[-1]["net_id"])["num_unread_notifications"] == 1
+
+    assert user_model.send_notifications([{"user_id": players[0]["user_id"]}]) is None
@@ -11,7 +11,7 @@ Serves two functions:
 import os
 from flask import Flask, render_template
 from .models.exception import TigerLeaguesException
-from . import league, auth, user, admin, error
+from . import league, auth, user, admin, error, sessions
 
 def create_app(test_config=None):
     """
@@ -41,6 +41,9 @@ def create_app(test_config=None):
     except OSError:
         pass
 
+    # Keep the sessions in the cookie, or on the server (see config.SESSION_STORE)
+    app.session_interface = sessions.make_session_interface(app)
+
     # Register blueprints
     app.register_blueprint(auth.bp)
     app.register_blueprint(league.bp) 
@@ -246,8 +246,9 @@ def start_league(league_id):
 
     :return: ``flask.Response(mimetype=application/json)``
 
-    If responding to a POST request, generate the league fixtures. Return a 
-    JSON response contains the keys ``success`` and ``message``
+    If responding to a POST request, generate the league fixtures. The optional 
+    ``num_legs`` query parameter sets how many times each pair of players 
+    meets. Return a JSON response contains the keys ``success`` and ``message``
     
     """
     league_not_started()
@@ -264,7 +265,8 @@ def start_league(league_id):
     if request.method == "POST":
         return jsonify(
             admin_model.generate_league_fixtures(
-                league_id, request.json
+                league_id, request.json, 
+                num_legs=request.args.get("num_legs", 1, type=int)
             )
         )
     
@@ -279,7 +281,11 @@ def allocate_league_divisions(league_id):
 
     :return: ``flask.Response(mimetype=application/json)``
 
-    A JSON object containing allocations of players in a league into divisions
+    A JSON object containing allocations of players in a league into divisions. 
+    The optional ``group_by`` list in the body keeps players who gave the same 
+    answers to those questions in the same division, while the optional 
+    ``seeding`` (``tiers`` or ``snake``) uses the players' results in other 
+    leagues.
 
     """
     return jsonify(
@@ -297,7 +303,9 @@ def approve_scores(league_id):
     :return: ``flask.Response(mimetype=text/html)``
 
     If responding to a GET request, render a HTML page that allows the admin to 
-    approve any reported scores.
+    approve any reported scores. The optional ``page_size`` and ``page`` query 
+    parameters limit the number of matches shown per division. Every division 
+    is listed on every page, even if it has no matches on that page.
 
     :return: ``flask.Response(mimetype=application/json)``
 
@@ -310,10 +318,16 @@ def approve_scores(league_id):
     league_has_started()
 
     if request.method == "GET":
+        page = max(request.args.get("page", 1, type=int), 1)
+        page_size = request.args.get("page_size", None, type=int)
+        if page_size is not None: page_size = max(page_size, 1)
         return render_template(
             "/admin/admin_league_homepage.html",
             league_info=league_model.get_league_info(league_id), 
-            reported_matches=admin_model.get_current_matches(league_id)
+            reported_matches=admin_model.get_current_matches(
+                league_id, page=page, page_size=page_size
+            ),
+            page=page, page_size=page_size
         )
 
     if request.method == "POST":
@@ -9,7 +9,7 @@ Exposes a blueprint that handles requests made to the `auth` endpoint
 from flask import (
     Blueprint, render_template, session, redirect, url_for, request
 )
-from . import cas_client
+from . import cas_client, sessions
 from .models import user_model
 
 cas = cas_client.CASClient()
@@ -34,9 +34,12 @@ def cas_login():
     Log in users through CAS. At the end of the CAS-related stuff, the rest of 
     the application expects to find a user object set in the session object.
 
-    Note that the contents of the session are public, but immutable. Please 
-    exclude values that you would not like the world to see. If sensitive data 
-    is needed, leave it to the caller to query the database themselves.
+    The session is given a new ID once the user is authenticated, so that an ID 
+    obtained before logging in can't be used to act as the user. Depending on 
+    ``config.SESSION_STORE``, the contents of the session are either kept on 
+    the server, or are public (but signed) in the cookie. Please exclude values 
+    that you would not like the world to see. If sensitive data is needed, 
+    leave it to the caller to query the database themselves.
 
     :return: ``flask.Response(code=302)`` 
     
@@ -50,6 +53,7 @@ def cas_login():
         return r
 
     net_id = r
+    sessions.regenerate_session(session)
     user_data = user_model.get_user(net_id)
     session["user"] = user_data
     session["net_id"] = net_id
@@ -68,5 +72,6 @@ def cas_logout():
 
     """
     session.clear()
+    sessions.regenerate_session(session)
     return redirect(url_for("auth.index"))
     
\ No newline at end of file
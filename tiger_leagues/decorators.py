@@ -43,7 +43,8 @@ def login_required(f):
 def refresh_user_profile(f):
     """
     A decorator function that is updates the user object stored in the session 
-    object. This is helpful when keeping the user up to date.
+    object. This is helpful when keeping the user up to date. The profile is 
+    served from ``user_model.profile_cache`` unless it was changed recently.
 
     http://flask.pocoo.org/docs/1.0/patterns/viewdecorators/#login-required-decorator
 
@@ -60,7 +61,9 @@ def refresh_user_profile(f):
     def decorated_function(*args, **kwargs):
         prev_user_profile = session.get("user")
         if prev_user_profile is not None:
-            session["user"] = user_model.get_user(prev_user_profile["net_id"])
+            session["user"] = user_model.get_user(
+                prev_user_profile["net_id"], use_cache=True
+            )
         # This check helps when the database has been wiped and the user is logged in
         if session.get("user") is None:
             return redirect(url_for("auth.cas_logout"))
@@ -5,15 +5,24 @@ Exposes functions that are used by the controller for the `/admin/*` endpoint
 
 """
 
-from collections import defaultdict, OrderedDict
+import json
+from sys import stderr
+from collections import defaultdict, OrderedDict, Counter
 from random import shuffle
-from math import ceil, inf
+from math import ceil
 from datetime import date, timedelta
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 
-from . import league_model, db_model, user_model
+from psycopg2 import DatabaseError
+
+from . import league_model, db_model, user_model, config
 from .exception import TigerLeaguesException, validate_values
 
-db = db_model.Database()
+SEEDING_TIERS = "tiers"
+SEEDING_SNAKE = "snake"
+
+db = db_model.db
 
 def get_join_league_requests(league_id):
     """
@@ -21,20 +30,30 @@ def get_join_league_requests(league_id):
     
     The ID of the league
 
-    :return: ``List[DictCursor]`` 
+    :return: ``List[dict]`` 
     
-    A row for each user who submitted a request to join this league.
+    A row for each user who submitted a request to join this league. Each dict 
+    is keyed by ``user_id``, ``name``, ``status``, ``division_id`` and the IDs 
+    of the league's questions.
 
     """
-    league_response_table_name = "league_responses_{}".format(league_id)
-    join_requests = db.execute(
-        "SELECT {}.*, users.name FROM {}, users WHERE users.user_id = {}.user_id", 
-        dynamic_table_or_column_names=[
-            league_response_table_name,
-            league_response_table_name,
-            league_response_table_name
-        ]
+    cursor = db.execute(
+        (
+            "SELECT league_memberships.user_id, users.name, status, division_id, responses "
+            "FROM league_memberships, users "
+            "WHERE league_memberships.league_id = %s "
+            "AND users.user_id = league_memberships.user_id;"
+        ),
+        values=[league_id]
     )
+    join_requests = []
+    for row in cursor:
+        join_request = dict(row["responses"] or {})
+        join_request.update(
+            user_id=row["user_id"], name=row["name"], status=row["status"], 
+            division_id=row["division_id"]
+        )
+        join_requests.append(join_request)
     return join_requests
 
 def update_join_league_requests(league_id, league_statuses):
@@ -53,15 +72,13 @@ def update_join_league_requests(league_id, league_statuses):
     Otherwise, ``message`` will contain an error description.
 
     """
-    responses_table_name = "league_responses_{}".format(league_id)
     available_statuses = {
         league_model.STATUS_ADMIN, league_model.STATUS_DENIED, 
         league_model.STATUS_MEMBER, league_model.STATUS_PENDING
     }
     cursor = db.execute(
-        "SELECT user_id FROM {} WHERE status = %s;",
-        dynamic_table_or_column_names=[responses_table_name],
-        values=[league_model.STATUS_ADMIN]
+        "SELECT user_id FROM league_memberships WHERE league_id = %s AND status = %s;",
+        values=[league_id, league_model.STATUS_ADMIN]
     )
     existing_admins = {int(x["user_id"]) for x in cursor}
 
@@ -85,22 +102,35 @@ def update_join_league_requests(league_id, league_statuses):
             "The league must have at least 1 admin"
         )    
     
-    user_id_to_status = {}
-    for user_id, user_status in league_statuses.items():
-        update_results = db.execute(
-            "UPDATE {} SET status=%s WHERE user_id=%s RETURNING status;",
-            dynamic_table_or_column_names=[responses_table_name],
-            values=[user_status, user_id]
-        ).fetchone()
-        if update_results is not None:
-            user_model.send_notification(user_id, {
-                "league_id": league_id,
-                "notification_text": "Your status changed.\n\nNew status: {}".format(update_results["status"])
-            })
-            user_id_to_status[user_id] = update_results["status"]
-        else:
-            user_id_to_status[user_id] = None
-
+    with db.transaction():
+        # One statement for the whole roster, instead of one UPDATE per user
+        cursor = db.execute_many(
+            (
+                "UPDATE league_memberships SET status = data.status "
+                "FROM (VALUES %s) AS data (user_id, league_id, status) "
+                "WHERE league_memberships.user_id = data.user_id "
+                "AND league_memberships.league_id = data.league_id "
+                "RETURNING league_memberships.user_id, league_memberships.status;"
+            ),
+            [
+                (int(user_id), int(league_id), user_status) 
+                for user_id, user_status in league_statuses.items()
+            ],
+            page_size=len(league_statuses)
+        ) if league_statuses else []
+        updated_statuses = {row["user_id"]: row["status"] for row in cursor}
+
+        user_model.send_notifications([
+            {
+                "user_id": user_id, "league_id": league_id,
+                "notification_text": "Your status changed.\n\nNew status: {}".format(status)
+            } for user_id, status in updated_statuses.items()
+        ])
+        user_model.invalidate_cached_profiles(updated_statuses.keys())
+
+    user_id_to_status = {
+        user_id: updated_statuses.get(int(user_id)) for user_id in league_statuses
+    }
     return {
         "success": True, "status": 200, "message": user_id_to_status
     }
@@ -116,10 +146,9 @@ def get_registration_stats(league_id):
     The keys are various join statuses and the values are their frequency.
 
     """
-    league_response_table_name = "league_responses_{}".format(league_id)
     cursor = db.execute(
-        "SELECT status FROM {};",
-        dynamic_table_or_column_names=[league_response_table_name]
+        "SELECT status FROM league_memberships WHERE league_id = %s;",
+        values=[league_id]
     )
     registration_stats = defaultdict(lambda: 0)
     for row in cursor:
@@ -127,7 +156,8 @@ def get_registration_stats(league_id):
 
     return registration_stats
 
-def generate_league_fixtures(league_id, div_allocations, start_date=None):
+def generate_league_fixtures(league_id, div_allocations, start_date=None, num_legs=1,
+                             num_workers=None):
     """
     :param league_id: int 
     
@@ -143,17 +173,33 @@ def generate_league_fixtures(league_id, div_allocations, start_date=None):
     The earliest games' time window will start from this date. Defaults to 
     tomorrow
 
+    :kwarg num_legs: int
+
+    The number of times that each pair of players in a division should meet, 
+    e.g. ``2`` for a double round robin. Home and away alternate between legs.
+
+    :kwarg num_workers: int
+
+    The number of processes that generate the divisions' fixtures. Defaults to 
+    ``config.FIXTURE_WORKERS``. With more than 1, the divisions are generated 
+    and encoded in parallel, and this process only streams them into the 
+    database.
+
     :return: ``dict`` 
     
     If ``success`` is ``False``, ``message`` will have a description of why the 
     call failed. Otherwise, ``message`` will contain a string confirming that 
-    the fixtures were generated.
+    the fixtures were generated, and ``match_counts`` will map each division ID 
+    to the number of matches that were scheduled in it.
 
     """
 
     if not div_allocations: return {
         "success": False, "message": "Cannot create an empty league"
     }
+    if not isinstance(num_legs, int) or num_legs < 1: return {
+        "success": False, "message": "Each pair of players must meet at least once"
+    }
 
     # Assert that the division allocations have the expected structure
     active_league_players = __fetch_active_league_players(league_id)
@@ -180,36 +226,10 @@ def generate_league_fixtures(league_id, div_allocations, start_date=None):
         "message": "Some players have not been allocated. Try refreshing the page to fetch an updated list of players"
     }
 
-    # Delete any existing fixtures
-    db.execute(
-        "DELETE FROM match_info WHERE league_id = %s", values=[league_id]
-    )
-    
-    # Generate the fixtures for each division
-    league_info = league_model.get_league_info(league_id)
-    timeslot_length = timedelta(days=ceil(league_info["length_period_in_days"]))
-    if start_date is None: start_date = date.today() + timedelta(days=1)
-    match_deadline = start_date + timeslot_length
-
     player_ids_to_div_ids = {}
     for division_id, division_players in div_allocations.items():
-        player_ids = [x["user_id"] for x in division_players]
-        fixtures = fixture_generator(player_ids)
-        deadline = match_deadline
-        for current_matches in fixtures:
-            for matchup in current_matches:
-                db.execute(
-                    (
-                        "INSERT INTO match_info (user_1_id, user_2_id, league_id, "
-                        "division_id, deadline) VALUES (%s, %s, %s, %s, %s);"
-                    ), 
-                    values=[
-                        matchup[0], matchup[1], league_id, division_id, deadline
-                    ]
-                )
-            deadline += timeslot_length
-        
-        for player_id in player_ids:
+        for player_object in division_players:
+            player_id = player_object["user_id"]
             if player_id not in player_ids_to_div_ids:
                 player_ids_to_div_ids[player_id] = division_id
             else:
@@ -219,54 +239,257 @@ def generate_league_fixtures(league_id, div_allocations, start_date=None):
                     )
                 )
 
-    responses_table_name = "league_responses_{}".format(league_id)
-    db.execute_many(
-        (
-            "UPDATE {} SET division_id = data.division_id FROM (VALUES %s) "
-            "AS data (user_id, division_id) WHERE {}.user_id = data.user_id;"
-        ),
-        [(user_id, int(div_id)) for user_id, div_id in player_ids_to_div_ids.items()], 
-        dynamic_table_or_column_names=[responses_table_name, responses_table_name]
-    )
+    league_info = league_model.get_league_info(league_id)
+    timeslot_length = timedelta(days=ceil(league_info["length_period_in_days"]))
+    if start_date is None: start_date = date.today() + timedelta(days=1)
+    match_deadline = start_date + timeslot_length
 
-    # Notify all members that the league has started
-    db.execute_many(
-        "INSERT INTO notifications (user_id, league_id, notification_text) VALUES %s",
-        [(user_id, league_id, "The league has started!") for user_id in player_ids_to_div_ids]
-    )
+    num_matches_per_div = {
+        int(division_id): len(division_players) * (len(division_players) - 1) // 2 * num_legs
+        for division_id, division_players in div_allocations.items()
+    }
 
-    db.execute(
-        "UPDATE league_info SET league_status = %s WHERE league_id = %s",
-        values=[league_model.LEAGUE_STAGE_IN_PROGRESS, league_id]
-    )
+    if num_workers is None: num_workers = config.FIXTURE_WORKERS
+    num_workers = min(num_workers, len(div_allocations))
+    divisions_args = [
+        (league_id, division_id, division_players, match_deadline, timeslot_length, num_legs)
+        for division_id, division_players in div_allocations.items()
+    ]
+    match_columns = ["user_1_id", "user_2_id", "league_id", "division_id", "deadline"]
+
+    with ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else nullcontext() as executor, \
+            db.transaction():
+        # Delete any existing fixtures
+        db.execute(
+            "DELETE FROM match_info WHERE league_id = %s", values=[league_id]
+        )
+        if executor is None:
+            # The fixtures are generated while COPY reads them, so the 
+            # schedule is never collected in memory
+            db.copy_records(
+                "match_info", match_columns, 
+                (
+                    record for division_args in divisions_args 
+                    for record in __division_fixtures(*division_args)
+                )
+            )
+        else:
+            # Each worker returns a division's rows already encoded for COPY. 
+            # They're streamed in division order as they become ready, so the 
+            # database ingests one division while the next ones are generated
+            db.copy_records(
+                "match_info", match_columns, 
+                executor.map(__encode_division_fixtures, divisions_args), 
+                encoded=True
+            )
+
+        db.execute_many(
+            (
+                "UPDATE league_memberships SET division_id = data.division_id "
+                "FROM (VALUES %s) AS data (user_id, league_id, division_id) "
+                "WHERE league_memberships.user_id = data.user_id "
+                "AND league_memberships.league_id = data.league_id;"
+            ),
+            [
+                (user_id, league_id, int(div_id)) 
+                for user_id, div_id in player_ids_to_div_ids.items()
+            ]
+        )
 
-    for division_id in div_allocations:
-        league_model.update_league_standings(league_id, division_id)
+        # Notify all members that the league has started
+        user_model.send_notifications([
+            {"user_id": user_id, "league_id": league_id, "notification_text": "The league has started!"}
+            for user_id in player_ids_to_div_ids
+        ])
+
+        db.execute(
+            "UPDATE league_info SET league_status = %s WHERE league_id = %s",
+            values=[league_model.LEAGUE_STAGE_IN_PROGRESS, league_id]
+        )
+        user_model.invalidate_cached_profiles(player_ids_to_div_ids.keys())
+
+        for division_id in div_allocations:
+            league_model.update_league_standings(
+                league_id, division_id, aggregate_in_database=True
+            )
     
     return {
-        "success": True, "message": "Fixtures successfully created!"
+        "success": True, "message": "Fixtures successfully created!",
+        "match_counts": num_matches_per_div
     }
 
-def __fetch_active_league_players(league_id):
+def __division_fixtures(league_id, division_id, division_players, first_deadline, 
+                        timeslot_length, num_legs):
+    """
+    :return: ``Iterator[tuple]``
+
+    Lazily yields the division's fixtures as ``(user_1_id, user_2_id, 
+    league_id, division_id, deadline)`` rows of ``match_info``, so that they 
+    can be streamed into the database. Each round is due one 
+    ``timeslot_length`` after the previous one.
+
+    """
+    player_ids = [x["user_id"] for x in division_players]
+    deadline = first_deadline
+    for current_matches in iter_fixture_rounds(player_ids, num_legs=num_legs):
+        for user_1_id, user_2_id in current_matches:
+            yield (user_1_id, user_2_id, league_id, int(division_id), deadline)
+        deadline += timeslot_length
+
+def __encode_division_fixtures(division_args):
+    """
+    :return: ``str``
+
+    The fixtures of :py:func:`.__division_fixtures` called with 
+    ``division_args``, encoded in ``COPY``'s text format. It runs in the worker 
+    processes of :py:func:`.generate_league_fixtures`.
+
+    """
+    return db_model.RecordsReader.encode_records(__division_fixtures(*division_args))
+
+def __fetch_active_league_players(league_id, include_responses=False):
     """
     :param league_id: int 
     
     The ID of the league
 
+    :kwarg include_responses: bool
+
+    If ``True``, also fetch each player's answers to the league's questions, 
+    keyed by ``responses``
+
     :return: ``List[DictRow]`` 
     
     A list of all players in the league who are eligible to play league games.
 
     """
-    table_name = "league_responses_{}".format(league_id)
     cursor = db.execute(
-        "SELECT users.user_id, users.name FROM {}, users WHERE ({}.status = %s "
-        "OR {}.status = %s) AND users.user_id = {}.user_id;",
-        values=[league_model.STATUS_ADMIN, league_model.STATUS_MEMBER],
-        dynamic_table_or_column_names=[table_name, table_name, table_name, table_name]
+        (
+            "SELECT users.user_id, users.name{} FROM league_memberships, users "
+            "WHERE league_memberships.league_id = %s AND league_memberships.status IN (%s, %s) "
+            "AND users.user_id = league_memberships.user_id;"
+        ).format(", league_memberships.responses" if include_responses else ""),
+        values=[league_id, league_model.STATUS_ADMIN, league_model.STATUS_MEMBER]
     )
     return cursor.fetchall()
 
+def __parse_question_ids(question_ids):
+    """
+    :param question_ids: list[str] or str
+
+    A list of question IDs, or a comma-separated string of question IDs
+
+    :return: ``list[str]``
+
+    The question IDs, without duplicates, in the order that they were given
+
+    :raise: ``ValueError``
+
+    If ``question_ids`` is neither a list nor a string
+    """
+    if isinstance(question_ids, str):
+        question_ids = question_ids.split(",")
+    if not isinstance(question_ids, list):
+        raise ValueError("Expected a list of question IDs")
+    return list(OrderedDict.fromkeys(
+        str(question_id).strip() for question_id in question_ids if str(question_id).strip()
+    ))
+
+def __order_players_by_responses(players, group_by):
+    """
+    :param players: list[dict]
+
+    The players to be ordered. If ``group_by`` is not empty, each player should 
+    have a ``responses`` key.
+
+    :param group_by: list[str]
+
+    The IDs of the questions whose answers players in the same division should 
+    share, from the most to the least important.
+
+    :return: ``list[dict]``
+
+    The players, shuffled, but such that players who gave the same answers are 
+    next to each other. Larger groups come first, and players who share the 
+    answer to an earlier question in ``group_by`` stay next to each other, even 
+    if their answers to the later questions differ. Cutting this list into 
+    consecutive slices thus splits as few groups as possible.
+
+    """
+    shuffle(players)
+    if not group_by: return players
+
+    answers = [
+        tuple(
+            str((player["responses"] or {}).get(question_id, "")) 
+            for question_id in group_by
+        ) for player in players
+    ]
+    group_sizes = Counter(
+        player_answers[:depth] for player_answers in answers 
+        for depth in range(1, len(group_by) + 1)
+    )
+
+    def sort_key(idx):
+        key = []
+        for depth in range(1, len(group_by) + 1):
+            group = answers[idx][:depth]
+            key.extend((-group_sizes[group], group[-1]))
+        return key
+
+    # ``sorted`` is stable, so players within a group remain shuffled
+    return [players[idx] for idx in sorted(range(len(players)), key=sort_key)]
+
+def __order_players_by_past_performance(league_id, players):
+    """
+    :param league_id: int
+
+    The ID of the league that the players are being allocated in
+
+    :param players: list[dict]
+
+    The active players of the league. Expected keys: ``user_id``
+
+    :return: ``list[dict]``
+
+    The players, from the strongest to the weakest. Strength is measured over 
+    all the player's standings in other leagues: the share of the available 
+    points that they won (which makes leagues with different points systems 
+    comparable), then their goal difference per game. Players without any 
+    games elsewhere come last, in random order.
+
+    """
+    cursor = db.execute(
+        (
+            "SELECT members.user_id, "
+            "SUM(past.points)::FLOAT / NULLIF(SUM(past.games_played * past_league.points_per_win), 0) "
+            "AS points_share, "
+            "SUM(past.goal_diff)::FLOAT / SUM(past.games_played) AS goal_diff_per_game "
+            "FROM league_memberships AS members "
+            "JOIN league_standings AS past "
+            "ON past.user_id = members.user_id AND past.league_id <> members.league_id "
+            "JOIN league_info AS past_league ON past_league.league_id = past.league_id "
+            "WHERE members.league_id = %s AND members.status IN (%s, %s) "
+            "AND past.games_played > 0 "
+            "GROUP BY members.user_id;"
+        ),
+        values=[league_id, league_model.STATUS_ADMIN, league_model.STATUS_MEMBER]
+    )
+    past_performance = {
+        row["user_id"]: (-(row["points_share"] or 0), -(row["goal_diff_per_game"] or 0))
+        for row in cursor
+    }
+
+    # ``sorted`` is stable, so players with the same record remain shuffled
+    shuffle(players)
+    return sorted(
+        players, 
+        key=lambda player: (
+            player["user_id"] not in past_performance, 
+            past_performance.get(player["user_id"], (0, 0))
+        )
+    )
+
 def allocate_league_divisions(league_id, desired_allocation_config):
     """
     :param league_id: int 
@@ -276,13 +499,22 @@ def allocate_league_divisions(league_id, desired_allocation_config):
     :param desired_allocation_config: dict 
     
     Options to use when allocating the divisions. Keys may include 
-    ``num_games_per_period``, ``length_period_in_days``, ``completion_deadline``
+    ``num_games_per_period``, ``length_period_in_days``, ``completion_deadline``, 
+    ``num_legs``, ``group_by``. ``group_by`` lists the IDs of the league's 
+    questions, most important first. Players with the same answers to them are 
+    kept in the same division, as far as the division sizes allow. 
+    ``seeding`` ranks the players by their results in other leagues, and then 
+    either fills the divisions from the top (``SEEDING_TIERS``, so division 1 
+    is the strongest), or deals the players out in a snake order 
+    (``SEEDING_SNAKE``, so the divisions are evenly matched). ``seeding`` can't 
+    be combined with ``group_by``.
 
     :return: ``dict``
     
     If ``success`` is ``False``, ``message`` contains a string describing what 
     went wrong. 
-    Otherwise, ``message`` is a dict keyed by ``divisions`` and ``end_date``
+    Otherwise, ``message`` is a dict keyed by ``divisions``, ``end_date`` and 
+    ``num_legs``
 
     """
     allocation_config = {}
@@ -290,7 +522,10 @@ def allocate_league_divisions(league_id, desired_allocation_config):
         "num_games_per_period": int,
         "length_period_in_days": int, 
         "completion_deadline": date.fromisoformat,
-        "start_date": date.fromisoformat
+        "start_date": date.fromisoformat,
+        "num_legs": int,
+        "group_by": __parse_question_ids,
+        "seeding": str
     }
     for param in allowed_params:
         if param in desired_allocation_config:
@@ -306,8 +541,45 @@ def allocate_league_divisions(league_id, desired_allocation_config):
             "success": False, 
             "message": "Received no values. Expected: {}".format(", ".join(allowed_params.keys()))
         }
+    num_legs = allocation_config.get("num_legs", 1)
+    if num_legs < 1:
+        return {"success": False, "message": "Each pair of players must meet at least once"}
 
-    active_league_players = __fetch_active_league_players(league_id)
+    group_by = allocation_config.get("group_by", [])
+    seeding = allocation_config.get("seeding")
+    if seeding not in (None, SEEDING_TIERS, SEEDING_SNAKE):
+        return {
+            "success": False, 
+            "message": "Unknown seeding: {}. Expected: {}, {}".format(
+                seeding, SEEDING_TIERS, SEEDING_SNAKE
+            )
+        }
+    if seeding and group_by:
+        return {
+            "success": False, 
+            "message": "Divisions can either be seeded or grouped by answers, not both"
+        }
+
+    if group_by:
+        league_questions = db.execute(
+            "SELECT additional_questions FROM league_info WHERE league_id = %s;",
+            values=[league_id]
+        ).fetchone()
+        league_questions = json.loads(
+            (league_questions and league_questions["additional_questions"]) or "{}"
+        )
+        unknown_question_ids = [
+            question_id for question_id in group_by if question_id not in league_questions
+        ]
+        if unknown_question_ids:
+            return {
+                "success": False, 
+                "message": "Unknown question(s): {}".format(", ".join(unknown_question_ids))
+            }
+
+    active_league_players = __fetch_active_league_players(
+        league_id, include_responses=bool(group_by)
+    )
     num_players = len(active_league_players)
 
     if "num_games_per_period" in allocation_config and "length_period_in_days" in allocation_config:
@@ -334,7 +606,7 @@ def allocate_league_divisions(league_id, desired_allocation_config):
 
     if "completion_deadline" in allocation_config:
         max_num_games_per_timeslot = ceil(num_players / 2.0)
-        num_total_games = int(num_players * (num_players - 1) / 2.0)
+        num_total_games = int(num_players * (num_players - 1) / 2.0) * num_legs
         num_available_timeslots = max(
             1, 
             (
@@ -347,24 +619,39 @@ def allocate_league_divisions(league_id, desired_allocation_config):
     else:
         num_divisions = 1
 
-    shuffle(active_league_players)
-    num_players_per_div = int(num_players * 1.0 / num_divisions)
-    division_allocations = {}
-    i = 0
-    for division_id in range(1, ceil(num_divisions) + 1):
-        current_division = []
-        for _2 in range(num_players_per_div):
-            current_division.append(dict(**active_league_players[i]))
-            i += 1
-        division_allocations[division_id] = current_division
-
-    # Allocate the remainders...
-    j, div_ids = 0, list(division_allocations.keys())
-    len_div_ids = len(div_ids)
-    while i < len(active_league_players):
-        division_allocations[div_ids[j % len_div_ids]].append(dict(**active_league_players[i]))
-        i += 1
-        j += 1
+    if seeding:
+        ordered_players = __order_players_by_past_performance(
+            league_id, list(active_league_players)
+        )
+    else:
+        ordered_players = __order_players_by_responses(list(active_league_players), group_by)
+
+    num_divisions = ceil(num_divisions)
+    division_allocations = OrderedDict(
+        (division_id, []) for division_id in range(1, num_divisions + 1)
+    )
+    if seeding == SEEDING_SNAKE:
+        # 1, 2, ..., n, n, ..., 2, 1, 1, 2, ... so that every division gets a 
+        # similar mix of strong and weak players
+        for idx, player in enumerate(ordered_players):
+            round_index, position = divmod(idx, num_divisions)
+            if round_index % 2: position = num_divisions - 1 - position
+            division_allocations[position + 1].append(
+                {"user_id": player["user_id"], "name": player["name"]}
+            )
+    else:
+        # Deal consecutive slices of the ordered players into the divisions. 
+        # The first ``num_remainders`` divisions get an extra player, so the 
+        # sizes differ by at most one.
+        num_players_per_div, num_remainders = divmod(num_players, num_divisions)
+        i = 0
+        for division_id in division_allocations:
+            division_size = num_players_per_div + (1 if division_id <= num_remainders else 0)
+            division_allocations[division_id] = [
+                {"user_id": player["user_id"], "name": player["name"]}
+                for player in ordered_players[i:i + division_size]
+            ]
+            i += division_size
 
     # Assert that everyone has a league
     players_with_divs = set()
@@ -376,97 +663,201 @@ def allocate_league_divisions(league_id, desired_allocation_config):
         num_players - len(players_with_divs), num_players
     )
 
+    num_rounds = max(
+        num_fixture_rounds(len(allocations), num_legs=num_legs) 
+        for allocations in division_allocations.values()
+    )
     league_end_date = start_date + timedelta(
-        days=ceil((num_players_per_div - 1) * allocation_config["num_days_between_matches"])
+        days=ceil(num_rounds * allocation_config["num_days_between_matches"])
     )
     return {
         "success": True, "message": {
             "divisions": division_allocations, 
-            "end_date": league_end_date.strftime("%A, %B %d, %Y")
+            "end_date": league_end_date.strftime("%A, %B %d, %Y"),
+            "num_legs": num_legs
         }
     }
 
-def fixture_generator(user_ids):
+def num_fixture_rounds(num_players, num_legs=1):
     """
+    :param num_players: int
 
-    :param user_ids: List[int]
+    The number of players in the division
 
-    A list of the IDs of users who are supposed to play each other.
+    :kwarg num_legs: int
 
-    :return: ``List[List[List]]`` 
-    
-    The innermost list has 2 elements (the IDs of the players involved in a game). 
-    The middle list has a collection of all the games being played at a 
-    particular timeslot. The outermost list encompasses all the games that will 
-    be played between all the users.
+    The number of times that each pair of players should meet
+
+    :return: ``int``
+
+    The number of rounds that it takes for every player to meet every other 
+    player ``num_legs`` times. With an odd number of players, each round has 
+    one player sitting out, so one more round is needed per leg.
 
     """
-    # we need a more effective of finding all the users in the league. 
-    # as of right now we need to iterate through every user and the league_ids they pertain to
-    length = len(user_ids)
+    if num_players < 2: return 0
+    return (num_players - 1 + num_players % 2) * num_legs
 
-    half = ceil(length/2)
+def fixture_round(user_ids, round_index):
+    """
+    Compute one round of a round-robin schedule with the circle method: the 
+    last slot stays put while the others rotate by one slot per round. Each 
+    pairing is worked out arithmetically, so any round can be produced on its 
+    own, without generating the ones before it.
 
-    tempList1 = [None] * half
-    tempList2 = [None] * half
+    Within a leg, every player hosts (i.e. is ``user_1``) at most one game more 
+    or less than they visit. Every other leg mirrors the previous one, so over 
+    an even number of legs each pair meets as often at home as away.
 
-    for i in range(0, half):
-    	tempList1[i] = user_ids[i]
+    :param user_ids: Sequence[int]
 
-    j = 0
-    for i in range(length-1, half-1, -1):
-    	tempList2[j] = user_ids[i]
-    	j += 1
+    The IDs of users who are supposed to play each other. With an odd number 
+    of users, a phantom player is added, and whoever is drawn against it sits 
+    out the round.
 
-    fixtures_list = []
-    rounds_list = []
-    pairs_list = []
+    :param round_index: int
 
-    for j in range(0,length-1):
-        for i in range(0, half):
-            pairs_list = [tempList1[i], tempList2[i]]
-            if (pairs_list[0] is not None and pairs_list[1] is not None):
-                rounds_list.append(pairs_list)
-            pairs_list = []
-        tempList1.insert(1, tempList2[0])
-        del tempList2[0]
-        tempList2.append(tempList1[half])
-        del tempList1[-1]
-        fixtures_list.append(rounds_list)
-        rounds_list = []
+    The index of the round. Indices past the first leg, i.e. from 
+    ``num_fixture_rounds(len(user_ids))`` onwards, continue into the next legs.
 
-    return fixtures_list
+    :return: ``tuple(tuple(int, int))``
+
+    The pairs of user IDs that play each other in this round, as 
+    ``(user_1_id, user_2_id)``
+
+    """
+    num_players = len(user_ids)
+    num_slots = num_players + num_players % 2
+    num_rotating_slots = num_slots - 1
+    leg_index, round_index = divmod(round_index, max(num_rotating_slots, 1))
+    pairings = []
+    for i in range(num_slots // 2):
+        if i == 0:
+            slot_a, slot_b = round_index, num_rotating_slots
+            swap_venue = round_index % 2 == 1
+        else:
+            slot_a = (round_index + i) % num_rotating_slots
+            slot_b = (round_index - i) % num_rotating_slots
+            swap_venue = i % 2 == 1
+        if leg_index % 2 == 1: swap_venue = not swap_venue
+        if swap_venue: slot_a, slot_b = slot_b, slot_a
+        # The phantom player occupies the last slot, past the real players
+        if slot_a < num_players and slot_b < num_players:
+            pairings.append((user_ids[slot_a], user_ids[slot_b]))
+    return tuple(pairings)
+
+def iter_fixture_rounds(user_ids, num_legs=1):
+    """
+    :param user_ids: Sequence[int]
+
+    The IDs of users who are supposed to play each other
+
+    :kwarg num_legs: int
+
+    The number of times that each pair of users should meet
+
+    :return: ``Iterator[tuple(tuple(int, int))]``
+
+    Lazily yields the rounds of a round-robin schedule in which every user 
+    plays every other user ``num_legs`` times. The legs are played one after 
+    the other, and since a pair meets once per leg, no pair meets in two 
+    consecutive rounds (unless there are only 2 users). See 
+    :py:meth:`.fixture_round`
 
-def get_current_matches(league_id):
+    """
+    for round_index in range(num_fixture_rounds(len(user_ids), num_legs=num_legs)):
+        yield fixture_round(user_ids, round_index)
+
+def fixture_generator(user_ids):
+    """
+
+    :param user_ids: List[int]
+
+    A list of the IDs of users who are supposed to play each other.
+
+    :return: ``List[tuple(tuple(int, int))]`` 
+    
+    The innermost tuple has 2 elements (the IDs of the players involved in a game). 
+    The middle tuple has a collection of all the games being played at a 
+    particular timeslot. The outermost list encompasses all the games that will 
+    be played between all the users.
+
+    """
+    return list(iter_fixture_rounds(user_ids))
+
+def get_current_matches(league_id, page=1, page_size=None):
     """
     :param league_id: int 
     
     The ID of the league
 
-    :return: ``List[DictRow]``
+    :kwarg page: int
+
+    Which page of each division's matches to return, starting from 1. Ignored 
+    if ``page_size`` is ``None``
+
+    :kwarg page_size: int
+
+    The maximum number of matches per division. Pages go back in time, i.e. 
+    the first page holds the matches with the latest deadlines. If ``None``, 
+    all the matches are returned.
+
+    :return: ``OrderedDict[int, dict]``
     
-    A list of all matches in the current time block. 
-    Keys include ``match_id``, ``league_id``, ``user_1_id``, ``user_2_id``, 
-    ``division_id``, ``score_user_1``, ``score_user_2``, ``status``, 
-    ``user_1_name``, ``user_2_name``
+    Keyed by the ID of each division that has matches whose deadline has 
+    passed, even if none of them is on the requested page. Each value has the 
+    keys ``matches``, the division's matches on the page, ordered by deadline, 
+    and ``num_matches``, the division's number of such matches across all the 
+    pages. Each match has the keys ``match_id``, ``league_id``, ``user_1_id``, 
+    ``user_2_id``, ``division_id``, ``score_user_1``, ``score_user_2``, 
+    ``status``, ``user_1_name``, ``user_2_name``, ``recent_updater_name``
 
     """
-    relevant_matches = league_model.get_matches_in_current_window(
-        league_id, num_periods_before=inf, num_periods_after=0
+    # The divisions are counted with a GROUP BY, and each division's page is 
+    # fetched by a LATERAL subquery that stops at the page's LIMIT. Only the 
+    # matches on the page are joined to the players' names. A division whose 
+    # page is empty still comes back, with its count.
+    due_conditions = (
+        "match_info.league_id = %(league_id)s "
+        "AND match_info.user_1_id IS NOT NULL AND match_info.user_2_id IS NOT NULL "
+        "AND match_info.deadline <= %(today)s"
     )
-    current_matches = defaultdict(list)
-    mapping = {"user_1_id": "user_1_name", "user_2_id": "user_2_name"}
-    for match in relevant_matches:
-        match_dict = dict(**match)
-        for key, val in mapping.items():
-            if match[key] is not None:
-                match_dict[val] = db.execute(
-                    "SELECT name FROM users WHERE user_id = %s",
-                    values=[match[key]]
-                ).fetchone()["name"]
-        current_matches[match_dict["division_id"]].append(match_dict)
-    
-    current_matches = OrderedDict(sorted(current_matches.items(), key=lambda t: t[0]))
+    cursor = db.execute(
+        (
+            "SELECT divisions.division_id AS page_division_id, "
+            "divisions.num_matches AS page_num_matches, page_matches.*, "
+            "user_1.name AS user_1_name, user_2.name AS user_2_name, "
+            "recent_updater.name AS recent_updater_name "
+            "FROM (SELECT division_id, COUNT(*) AS num_matches FROM match_info "
+            "WHERE {0} GROUP BY division_id) AS divisions "
+            "LEFT JOIN LATERAL ("
+            "SELECT match_info.* FROM match_info "
+            "WHERE {0} AND match_info.division_id = divisions.division_id "
+            "ORDER BY match_info.deadline DESC, match_info.match_id DESC "
+            "LIMIT %(page_size)s OFFSET %(page_offset)s"
+            ") AS page_matches ON TRUE "
+            "LEFT JOIN users AS user_1 ON user_1.user_id = page_matches.user_1_id "
+            "LEFT JOIN users AS user_2 ON user_2.user_id = page_matches.user_2_id "
+            "LEFT JOIN users AS recent_updater ON recent_updater.user_id = page_matches.recent_updater_id "
+            "ORDER BY divisions.division_id, page_matches.deadline, page_matches.match_id;"
+        ).format(due_conditions),
+        values={
+            # LIMIT NULL returns all the rows
+            "league_id": league_id, "today": date.today(), "page_size": page_size,
+            "page_offset": (max(page, 1) - 1) * page_size if page_size is not None else 0
+        }
+    )
+
+    # The rows arrive sorted by division, so they can be grouped in one pass
+    current_matches = OrderedDict()
+    for row in cursor:
+        division = current_matches.setdefault(
+            row["page_division_id"], {"matches": [], "num_matches": row["page_num_matches"]}
+        )
+        if row["match_id"] is None: continue
+        match = dict(**row)
+        del match["page_division_id"], match["page_num_matches"]
+        division["matches"].append(match)
 
     return current_matches
 
@@ -501,49 +892,59 @@ def approve_match(score_info, admin_user_id):
         ], jsonify=True
     )
 
-    previous_scores = db.execute(
-        "SELECT * FROM match_info WHERE match_id = %s", 
-        values=[score_info["match_id"]]
-    ).fetchone()
+    with db.transaction():
+        previous_scores = db.execute(
+            "SELECT * FROM match_info WHERE match_id = %s FOR UPDATE", 
+            values=[score_info["match_id"]]
+        ).fetchone()
 
-    if previous_scores["score_user_1"] == score_info["score_user_1"] and \
-        previous_scores["score_user_2"] == score_info["score_user_2"]:
-        recent_updater_id = previous_scores["recent_updater_id"]
-    else:
-        recent_updater_id = admin_user_id
-
-    row = db.execute(
-        "UPDATE match_info SET status = %s, score_user_1 = %s , score_user_2 = %s, recent_updater_id = %s \
-        WHERE match_id = %s RETURNING league_id, division_id, user_1_id, user_2_id;",
-        values=[
-            league_model.MATCH_STATUS_APPROVED, score_info["score_user_1"], 
-            score_info["score_user_2"], recent_updater_id, score_info["match_id"]
-        ]
-    ).fetchone()
-    league_model.update_league_standings(row["league_id"], row["division_id"])
+        if previous_scores["score_user_1"] == score_info["score_user_1"] and \
+            previous_scores["score_user_2"] == score_info["score_user_2"]:
+            recent_updater_id = previous_scores["recent_updater_id"]
+        else:
+            recent_updater_id = admin_user_id
 
-    user_1 = user_model.get_user(None, user_id=row["user_1_id"])
-    user_2 = user_model.get_user(None, user_id=row["user_2_id"])
+        row = db.execute(
+            "UPDATE match_info SET status = %s, score_user_1 = %s , score_user_2 = %s, recent_updater_id = %s \
+            WHERE match_id = %s RETURNING league_id, division_id, user_1_id, user_2_id;",
+            values=[
+                league_model.MATCH_STATUS_APPROVED, score_info["score_user_1"], 
+                score_info["score_user_2"], recent_updater_id, score_info["match_id"]
+            ]
+        ).fetchone()
+        league_model.update_league_standings_for_match(
+            previous_scores, {
+                "score_user_1": score_info["score_user_1"],
+                "score_user_2": score_info["score_user_2"],
+                "status": league_model.MATCH_STATUS_APPROVED
+            }
+        )
 
-    score_text = "{} {} - {} {}".format(
-        user_1["name"], score_info["score_user_1"], 
-        score_info["score_user_2"], user_2["name"]
-    )
+        user_1 = user_model.get_user(None, user_id=row["user_1_id"])
+        user_2 = user_model.get_user(None, user_id=row["user_2_id"])
 
-    for user_obj in (user_1, user_2):
-        user_model.send_notification(
-            user_obj["user_id"], {
-                "league_id": row["league_id"],
-                "notification_text": "Score approved: {}".format(score_text)
-            }
+        score_text = "{} {} - {} {}".format(
+            user_1["name"], score_info["score_user_1"], 
+            score_info["score_user_2"], user_2["name"]
         )
 
+        user_model.send_notifications([
+            {
+                "user_id": user_obj["user_id"], "league_id": row["league_id"],
+                "notification_text": "Score approved: {}".format(score_text)
+            } for user_obj in (user_1, user_2)
+        ])
+
     return {
         "success": True, "message": league_model.MATCH_STATUS_APPROVED
     }
 
 def delete_league(league_id):
     """
+    Remove the league and every row that belongs to it (memberships, matches, 
+    standings and the league's notifications) in one transaction, and notify 
+    the league's members.
+
     :param league_id: int 
     
     The ID of the league
@@ -551,44 +952,47 @@ def delete_league(league_id):
     :return: ``dict``
 
     Keys: ``success``, ``message``. If ``success`` is ``True``, ``message`` has 
-    a confirmation message. Otherwise, ``message`` explains why the deletion failed.
-
-    """
-
-    try:
-        league_info = league_model.get_league_info(league_id)
-        league_members = __fetch_active_league_players(league_id)
-        member_ids = {member["user_id"] for member in league_members}
-
-        for member_id in member_ids:
-            id_list = db.execute(("SELECT league_ids FROM users WHERE user_id = %s;"), values=[member_id])
-            leagues_string = id_list.fetchone()["league_ids"]
-            leagues_list = set(leagues_string.split(', '))
-            leagues_list.discard(str(league_id))
-
-            db.execute(
-                "UPDATE users SET league_ids = %s WHERE user_id = %s",
-                values=[", ".join(leagues_list), member_id]
-            )
+    a confirmation message. If the database rejected the deletion, ``success`` 
+    is ``False``, and the error is printed to ``stderr``.
 
-        # delete league from league_info and match_info tables
+    :raise: ``TigerLeaguesException``
 
-        db.execute(("DELETE FROM match_info WHERE league_id = %s;"),values=[league_id])
+    If the league does not exist
 
-        db.execute(("DELETE FROM league_info WHERE league_id = %s;"),values=[league_id])
+    """
 
-        # Notify all members that the league has been deleted
-        db.execute_many(
-            "INSERT INTO notifications (user_id, league_id, notification_text) VALUES %s",
-            [(user_id, None, "{} has been deleted! It's been real.".format(league_info["league_name"])) for user_id in member_ids]
-        )
+    try:
+        with db.transaction():
+            league_info = league_model.get_league_info(league_id)
+
+            # Each statement clears the league's rows in bulk, whatever the 
+            # number of members
+            removed_memberships = db.execute(
+                "DELETE FROM league_memberships WHERE league_id = %s RETURNING user_id, status;", 
+                values=[league_id]
+            ).fetchall()
+            db.execute("DELETE FROM match_info WHERE league_id = %s;", values=[league_id])
+            db.execute("DELETE FROM league_standings WHERE league_id = %s;", values=[league_id])
+            db.execute("DELETE FROM notifications WHERE league_id = %s;", values=[league_id])
+            db.execute("DELETE FROM league_info WHERE league_id = %s;", values=[league_id])
+            user_model.invalidate_cached_profiles(row["user_id"] for row in removed_memberships)
+
+            # Notify all members that the league has been deleted
+            user_model.send_notifications([
+                {
+                    "user_id": row["user_id"], "league_id": None,
+                    "notification_text": "{} has been deleted! It's been real.".format(league_info["league_name"])
+                } for row in removed_memberships
+                if row["status"] in (league_model.STATUS_ADMIN, league_model.STATUS_MEMBER)
+            ])
 
         return {
             "success": True, "message": "'{}' Successfully Deleted".format(league_info["league_name"])
         }
 
-    except Exception as e:
-
+    except DatabaseError as e:
+        # The transaction has been rolled back, so the league is left intact
+        print("\nFailed to delete league {}: {!r}\n".format(league_id, e), file=stderr)
         return {
             "success": False, "message": "Failed to Delete League"
         }
@@ -9,6 +9,11 @@ Expected environment variables: ``TIGER_LEAGUES_ENVIRONMENT``,
 ``TIGER_LEAGUES_POSTGRESQL_DBNAME``, ``TIGER_LEAGUES_POSTGRESQL_USERNAME``, 
 ``TIGER_LEAGUES_POSTGRESQL_PASSWORD``
 
+Optional environment variables: ``TIGER_LEAGUES_DB_POOL_MIN_SIZE``, 
+``TIGER_LEAGUES_DB_POOL_MAX_SIZE``, ``TIGER_LEAGUES_DB_POOL_TIMEOUT``, 
+``TIGER_LEAGUES_PROFILE_CACHE_TTL``, ``TIGER_LEAGUES_SESSION_STORE``, 
+``TIGER_LEAGUES_SESSION_SQLITE_PATH``, ``TIGER_LEAGUES_FIXTURE_WORKERS``
+
 """
 
 from os import environ
@@ -31,3 +36,34 @@ else:
     raise RuntimeError(
         "Please set the `TIGER_LEAGUES_ENVIRONMENT` to either `development` or `production`"
     )
+
+# Sizing of the database connection pool. Each process holds at most 
+# `DATABASE_POOL_MAX_SIZE` connections. A request that finds all of them in use 
+# waits up to `DATABASE_POOL_TIMEOUT` seconds before giving up.
+DATABASE_POOL_MIN_SIZE = int(environ.get("TIGER_LEAGUES_DB_POOL_MIN_SIZE", 1))
+DATABASE_POOL_MAX_SIZE = int(environ.get("TIGER_LEAGUES_DB_POOL_MAX_SIZE", 10))
+DATABASE_POOL_TIMEOUT = float(environ.get("TIGER_LEAGUES_DB_POOL_TIMEOUT", 30))
+
+# How long (in seconds) an assembled user profile may be served from the 
+# in-process cache. The write paths invalidate the cache explicitly; the TTL 
+# bounds how stale another process's copy can get. Set to 0 to disable caching.
+PROFILE_CACHE_TTL = float(environ.get("TIGER_LEAGUES_PROFILE_CACHE_TTL", 30))
+
+# Where the Flask sessions are kept. Either "cookie" (the default: Flask's 
+# signed cookie holds the whole session), "postgres" or "sqlite". With the last 
+# two, the cookie only carries an opaque session ID, at the cost of a lookup in 
+# the store on each request.
+SESSION_STORE = environ.get("TIGER_LEAGUES_SESSION_STORE", "cookie")
+if SESSION_STORE not in {"postgres", "sqlite", "cookie"}:
+    raise RuntimeError(
+        "Please set the `TIGER_LEAGUES_SESSION_STORE` to either `postgres`, `sqlite` or `cookie`"
+    )
+# The SQLite file used when `SESSION_STORE` is "sqlite". Relative paths are 
+# resolved against the Flask instance folder.
+SESSION_SQLITE_PATH = environ.get("TIGER_LEAGUES_SESSION_SQLITE_PATH", "sessions.sqlite3")
+
+# The number of processes that generate the fixtures of a league's divisions in 
+# parallel. The main process streams their rows into a single COPY, in the same 
+# transaction as before. 1 generates the divisions one after another in the 
+# main process.
+FIXTURE_WORKERS = int(environ.get("TIGER_LEAGUES_FIXTURE_WORKERS", 1))
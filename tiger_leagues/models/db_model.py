@@ -7,40 +7,608 @@ A wrapper around the database used by the 'Tiger Leagues' app
 
 from sys import stderr
 from warnings import warn
+from time import monotonic
+from threading import Lock, RLock, Event, local
+from contextlib import contextmanager
+from os import getpid
+from collections import deque
 import atexit
-from psycopg2 import connect, extras, sql
+from psycopg2 import connect, extras, sql, pool
 from . import config
 
+MATCH_INFO_INDEXES = [
+    ("match_info_approved_by_division", "(league_id, division_id) WHERE status = 'approved'"),
+    ("match_info_league_deadline", "(league_id, deadline)"),
+    ("match_info_user_1_deadline", "(user_1_id, league_id, deadline)"),
+    ("match_info_user_2_deadline", "(user_2_id, league_id, deadline)"),
+]
+"""
+The indexes that back the hot queries on ``match_info``: the standings 
+recomputation reads a division's approved matches, the fixtures pages read a 
+league's matches by deadline, and a player's page reads the matches where 
+they're either ``user_1_id`` or ``user_2_id``. Each item is the index name and 
+its definition.
+"""
+
+SCHEMA_MIGRATIONS = [
+    (
+        1, "Index match_info for standings, fixture windows and player lookups",
+        [
+            "CREATE INDEX IF NOT EXISTS {} ON match_info {};".format(name, definition)
+            for name, definition in MATCH_INFO_INDEXES
+        ]
+    ),
+    (
+        2, "Move league memberships from users.league_ids into league_memberships",
+        [
+            (
+                "CREATE TABLE IF NOT EXISTS league_memberships ("
+                "user_id INT NOT NULL, league_id INT NOT NULL, status VARCHAR(255), "
+                "division_id INT, PRIMARY KEY (user_id, league_id));"
+            ),
+            (
+                "CREATE INDEX IF NOT EXISTS league_memberships_league_status "
+                "ON league_memberships (league_id, status);"
+            ),
+            (
+                "CREATE INDEX IF NOT EXISTS league_memberships_league_division "
+                "ON league_memberships (league_id, division_id);"
+            ),
+            # The status and division used to be stored in each league's responses 
+            # table. A user whose ``league_ids`` no longer lists the league has 
+            # left it. Only databases created before this migration have these 
+            # tables and the ``league_ids`` column; on new ones, this is a no-op.
+            """
+            DO $$
+            DECLARE league RECORD;
+            BEGIN
+                FOR league IN SELECT league_id FROM league_info LOOP
+                    IF to_regclass('league_responses_' || league.league_id) IS NOT NULL THEN
+                        EXECUTE format(
+                            'INSERT INTO league_memberships (user_id, league_id, status, division_id) '
+                            'SELECT responses.user_id, %1$s, CASE '
+                            '    WHEN %1$s::TEXT = ANY(string_to_array(users.league_ids, '', '')) '
+                            '    THEN responses.status ELSE %3$L END, responses.division_id '
+                            'FROM %2$I AS responses JOIN users ON users.user_id = responses.user_id '
+                            'ON CONFLICT DO NOTHING',
+                            league.league_id, 'league_responses_' || league.league_id, 'inactive'
+                        );
+                        EXECUTE format(
+                            'ALTER TABLE %I DROP COLUMN IF EXISTS status, DROP COLUMN IF EXISTS division_id',
+                            'league_responses_' || league.league_id
+                        );
+                    END IF;
+                END LOOP;
+            END $$;
+            """,
+            "ALTER TABLE users DROP COLUMN IF EXISTS league_ids;"
+        ]
+    ),
+    (
+        3, "Store the answers to league questions in league_memberships.responses",
+        [
+            "ALTER TABLE league_memberships ADD COLUMN IF NOT EXISTS responses JSONB;",
+            # Copy each row of the per-league tables, minus its user_id, into the 
+            # matching membership. Tables of deleted leagues are simply dropped.
+            """
+            DO $$
+            DECLARE responses_table RECORD;
+            BEGIN
+                FOR responses_table IN 
+                    SELECT tablename, substring(tablename FROM '^league_responses_(\\d+)$')::INT AS league_id 
+                    FROM pg_catalog.pg_tables 
+                    WHERE schemaname = current_schema() AND tablename ~ '^league_responses_\\d+$'
+                LOOP
+                    EXECUTE format(
+                        'UPDATE league_memberships SET responses = to_jsonb(old_responses) - ''user_id'' '
+                        'FROM %1$I AS old_responses WHERE league_memberships.league_id = %2$s '
+                        'AND league_memberships.user_id = old_responses.user_id',
+                        responses_table.tablename, responses_table.league_id
+                    );
+                    EXECUTE format('DROP TABLE %I', responses_table.tablename);
+                END LOOP;
+            END $$;
+            """,
+            "UPDATE league_memberships SET responses = '{}' WHERE responses IS NULL;"
+        ]
+    ),
+    (
+        4, "Keep the Flask sessions on the server",
+        [
+            (
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id VARCHAR(64) PRIMARY KEY, data TEXT NOT NULL, "
+                "expires_at TIMESTAMPTZ NOT NULL);"
+            ),
+            "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);"
+        ]
+    ),
+    (
+        5, "Index the notifications like the keyset pagination of read_notifications",
+        [
+            # The notification_id breaks ties between notifications that were 
+            # created in the same transaction
+            (
+                "CREATE INDEX IF NOT EXISTS notifications_user_id_status_created_at_id "
+                "ON notifications (user_id, notification_status, created_at DESC, notification_id DESC);"
+            ),
+            # Serves the default page, which lists every status but 'archived'
+            (
+                "CREATE INDEX IF NOT EXISTS notifications_user_id_created_at_id "
+                "ON notifications (user_id, created_at DESC, notification_id DESC);"
+            )
+        ]
+    ),
+    (
+        6, "Index league_standings by user, for seeding divisions",
+        [
+            (
+                "CREATE INDEX IF NOT EXISTS league_standings_user_id "
+                "ON league_standings (user_id, league_id);"
+            )
+        ]
+    ),
+    (
+        7, "Delete the notifications of leagues that were deleted",
+        [
+            # delete_league now removes them along with the league, so that 
+            # counting a user's notifications needs no join with league_info
+            (
+                "DELETE FROM notifications WHERE league_id IS NOT NULL "
+                "AND NOT EXISTS (SELECT 1 FROM league_info "
+                "WHERE league_info.league_id = notifications.league_id);"
+            )
+        ]
+    ),
+]
+"""
+Versioned changes to the schema. :py:meth:`.Database.launch` creates the 
+original tables, and these steps are applied on top of them. 
+Each item is a ``(version, description, statements)`` tuple. New steps should 
+be appended with the next version number; applied ones should never be edited.
+"""
+
+SCHEMA_MIGRATIONS_LOCK_ID = 333333
+"""
+The key of the advisory lock that serializes migrations across processes
+"""
+
+class RecordsReader:
+    """
+    A read-only, file-like view of records in ``COPY``'s text format. The 
+    records are encoded as ``COPY`` asks for more data, so a generator of rows 
+    can be streamed into a table without holding all of them in memory.
+
+    :param records: iterable
+
+    Each item is a sequence of values. ``None`` is written as ``NULL``.
+
+    :kwarg encoded: bool
+
+    If ``True``, each item of ``records`` is instead a string that's already 
+    in ``COPY``'s text format, e.g. from :py:meth:`.encode_records`, and may 
+    hold any number of lines.
+
+    """
+
+    def __init__(self, records, encoded=False):
+        self.__chunks = iter(records) if encoded else map(self.encode_record, records)
+        self.__pending = ""
+        self.num_records = 0
+
+    @staticmethod
+    def encode(value):
+        """
+        :return: ``str``
+
+        ``value`` encoded for ``COPY``'s text format
+        """
+        if value is None: return "\\N"
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t") \
+            .replace("\n", "\\n").replace("\r", "\\r")
+
+    @staticmethod
+    def encode_record(record):
+        """
+        :return: ``str``
+
+        ``record`` encoded as one line of ``COPY``'s text format
+        """
+        return "\t".join([RecordsReader.encode(value) for value in record]) + "\n"
+
+    @staticmethod
+    def encode_records(records):
+        """
+        :return: ``str``
+
+        All of ``records`` encoded as lines of ``COPY``'s text format
+        """
+        return "".join([RecordsReader.encode_record(record) for record in records])
+
+    def read(self, size=-1):
+        """
+        :kwarg size: int
+
+        The maximum number of characters to return. If negative, all the 
+        remaining records are returned.
+
+        :return: ``str``
+
+        The next part of the ``COPY`` data, or ``""`` once the records have 
+        run out
+        """
+        chunks, chunk_size = [self.__pending], len(self.__pending)
+        while size < 0 or chunk_size < size:
+            chunk = next(self.__chunks, None)
+            if chunk is None: break
+            chunks.append(chunk)
+            chunk_size += len(chunk)
+            # Newlines within the values are escaped, so each one ends a record
+            self.num_records += chunk.count("\n")
+
+        data = "".join(chunks)
+        if size < 0: size = len(data)
+        self.__pending = data[size:]
+        return data[:size]
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of connections to the database. Unlike 
+    ``psycopg2.pool.ThreadedConnectionPool``, a caller that finds the pool 
+    exhausted waits for a connection to be returned instead of failing 
+    immediately. The pool also keeps statistics that help when sizing it.
+
+    :param connection_uri: str
+
+    The connection string for the database
+
+    :kwarg min_size: int
+
+    The number of connections that are opened when the pool is created
+
+    :kwarg max_size: int
+
+    The maximum number of connections that can be open at any given time
+
+    :kwarg timeout: float
+
+    The maximum number of seconds to wait for a connection to become available
+
+    :kwarg setup: function
+
+    If set, it's called with each newly opened connection, e.g. to set session 
+    variables
+
+    """
+
+    def __init__(self, connection_uri, min_size=1, max_size=10, timeout=30.0, 
+                 setup=None):
+        """
+        Initialize the pool and open ``min_size`` connections.
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                "Expected 0 <= min_size <= max_size and max_size >= 1. Got {} and {}".format(
+                    min_size, max_size
+                )
+            )
+        self.__connection_uri = connection_uri
+        self.__setup = setup
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+
+        self.__lock = Lock()
+        self.__waiters = deque()
+        self.__idle = []
+        self.__num_in_use = 0
+        self.__closed = False
+        self.__stats = {
+            "num_checkouts": 0, "num_waits": 0, "num_timeouts": 0, 
+            "total_wait_time": 0.0, "max_wait_time": 0.0
+        }
+
+        for _ in range(min_size):
+            self.__idle.append(self.__connect())
+
+    def __connect(self):
+        """
+        :return: ``psycopg2.extensions.connection``
+
+        A new connection to the database
+        """
+        connection = connect(self.__connection_uri)
+        if self.__setup is not None:
+            self.__setup(connection)
+        return connection
+
+    def getconn(self):
+        """
+        Check out a connection from the pool. If all ``max_size`` connections 
+        are in use, wait for up to ``timeout`` seconds for one to be returned. 
+        Waiting callers are served in the order in which they arrived.
+
+        :return: ``psycopg2.extensions.connection``
+
+        A connection that is reserved for the caller until it's passed to 
+        :py:meth:`.putconn`
+
+        :raise: ``psycopg2.pool.PoolError``
+
+        If the pool has been closed, or if no connection became available 
+        within ``timeout`` seconds.
+
+        """
+        start_time = monotonic()
+        with self.__lock:
+            if self.__closed:
+                raise pool.PoolError("The connection pool is closed")
+            if not self.__waiters and self.__idle:
+                return self.__checkout(self.__idle.pop(), start_time, False)
+            if not self.__waiters and self.__num_in_use + len(self.__idle) < self.max_size:
+                # Reserve a slot, but connect outside of the lock
+                self.__checkout(None, start_time, False)
+                return self.__connect_reserved_slot()
+            waiter = {"event": Event(), "connection": None, "granted": False}
+            self.__waiters.append(waiter)
+
+        waiter["event"].wait(self.timeout)
+        with self.__lock:
+            if not waiter["granted"]:
+                self.__waiters.remove(waiter)
+                if self.__closed:
+                    raise pool.PoolError("The connection pool is closed")
+                self.__stats["num_timeouts"] += 1
+                raise pool.PoolError(
+                    "Timed out after {}s waiting for a database connection. "
+                    "All {} connections are in use.".format(self.timeout, self.max_size)
+                )
+            self.__checkout(waiter["connection"], start_time, True)
+
+        if waiter["connection"] is None:
+            return self.__connect_reserved_slot()
+        return waiter["connection"]
+
+    def __checkout(self, connection, start_time, waited):
+        """
+        Record a checkout in the pool statistics. The caller must hold the lock. 
+        ``__num_in_use`` is incremented by whoever grants the connection.
+        """
+        if not waited: self.__num_in_use += 1
+        wait_time = monotonic() - start_time
+        self.__stats["num_checkouts"] += 1
+        self.__stats["total_wait_time"] += wait_time
+        self.__stats["max_wait_time"] = max(self.__stats["max_wait_time"], wait_time)
+        if waited: self.__stats["num_waits"] += 1
+        return connection
+
+    def __connect_reserved_slot(self):
+        """
+        Open a connection for a slot that has already been counted as in use. 
+        If connecting fails, the slot is released.
+        """
+        try:
+            return self.__connect()
+        except:
+            self.__release_slot(None)
+            raise
+
+    def putconn(self, connection, close=False):
+        """
+        Return a connection to the pool.
+
+        :param connection: psycopg2.extensions.connection
+
+        A connection that was obtained from :py:meth:`.getconn`
+
+        :kwarg close: bool
+
+        If ``True``, close the connection instead of keeping it for reuse. 
+        Connections that are already closed are always discarded.
+
+        """
+        keep_connection = not (close or connection.closed)
+        if not self.__release_slot(connection if keep_connection else None) \
+            and not connection.closed:
+            connection.close()
+
+    def __release_slot(self, connection):
+        """
+        Hand ``connection`` (or, if ``None``, the right to open a new one) to 
+        the longest waiting caller. If nobody is waiting, keep the connection 
+        as idle.
+
+        :return: ``bool``
+
+        ``True`` if the pool took ownership of ``connection``
+        """
+        with self.__lock:
+            if self.__closed:
+                self.__num_in_use -= 1
+                return False
+            if self.__waiters:
+                waiter = self.__waiters.popleft()
+                waiter["connection"] = connection
+                waiter["granted"] = True
+                waiter["event"].set()
+                return True
+            self.__num_in_use -= 1
+            if connection is not None:
+                self.__idle.append(connection)
+                return True
+            return False
+
+    def closeall(self):
+        """
+        Close all the idle connections and refuse any future checkouts. 
+        Connections that are checked out are closed once they're returned.
+        """
+        with self.__lock:
+            self.__closed = True
+            idle_connections, self.__idle = self.__idle, []
+            for waiter in self.__waiters:
+                waiter["event"].set()
+        for connection in idle_connections:
+            if not connection.closed:
+                connection.close()
+
+    def stats(self):
+        """
+        :return: ``dict``
+
+        A snapshot of the pool's state. Keys include ``min_size``, ``max_size``, 
+        ``in_use``, ``idle``, ``num_checkouts``, ``num_waits``, ``num_timeouts``, 
+        ``total_wait_time``, ``max_wait_time`` and ``avg_wait_time``. Times are 
+        in seconds.
+        """
+        with self.__lock:
+            snapshot = dict(**self.__stats)
+            snapshot["min_size"] = self.min_size
+            snapshot["max_size"] = self.max_size
+            snapshot["in_use"] = self.__num_in_use
+            snapshot["idle"] = len(self.__idle)
+        snapshot["avg_wait_time"] = snapshot["total_wait_time"] / max(1, snapshot["num_checkouts"])
+        return snapshot
+
 class Database:
     """
-    A wrapper around the database used by the 'Tiger Leagues' app.
+    A wrapper around the database used by the 'Tiger Leagues' app. Each call to 
+    :py:meth:`.execute` or :py:meth:`.execute_many` checks out a connection from 
+    a :py:class:`.ConnectionPool` and returns it once the statement completes, 
+    so concurrent requests do not serialize on a single connection.
+
+    No connection is made until the first statement is executed. At that point, 
+    the pool is opened and the tables are created if need be. If the process 
+    forks (e.g. ``gunicorn --preload``), the child opens its own pool instead of 
+    sharing the parent's sockets. The rest of the app should use the shared 
+    instance, :py:data:`.db`, rather than creating their own.
 
     :kwarg connection_uri: str
 
     Optional connection string for the database. If ``None``, this defaults to 
     the connection string set in ``config.DATABASE_URL``.
 
+    :kwarg min_pool_size: int
+
+    The number of connections opened up front. Defaults to 
+    ``config.DATABASE_POOL_MIN_SIZE``
+
+    :kwarg max_pool_size: int
+
+    The maximum number of concurrently open connections. Defaults to 
+    ``config.DATABASE_POOL_MAX_SIZE``
+
+    :kwarg pool_timeout: float
+
+    The maximum number of seconds to wait for a free connection. Defaults to 
+    ``config.DATABASE_POOL_TIMEOUT``
+
     """
 
-    def __init__(self, connection_uri=None):
+    def __init__(self, connection_uri=None, min_pool_size=None, max_pool_size=None, 
+                 pool_timeout=None):
         """
-        Initialize the database instance.
+        Initialize the database instance. This does not connect to the database.
         """
-        if connection_uri is None:
-            self.__connection = connect(config.DATABASE_URL)
-        else:
-            self.__connection = connect(connection_uri)
-        self.launch()
-        self.execute("SET TIME ZONE 'EST';")
+        self.__connection_uri = connection_uri
+        self.__min_pool_size = min_pool_size
+        self.__max_pool_size = max_pool_size
+        self.__pool_timeout = pool_timeout
+
+        self.__pool = None
+        self.__pool_pid = None
+        self.__ready_pid = None
+        self.__pool_lock = RLock()
+        self.__schema_launched = False
+        self.__launching = False
+        self.__local = local()
         atexit.register(self.disconnect)
 
+    def __get_pool(self):
+        """
+        :return: ``ConnectionPool``
+
+        The connection pool for the current process. The pool is created on 
+        first use, and re-created if the process has forked since then. On 
+        first use, the tables are also initialized via :py:meth:`.launch`.
+        """
+        if self.__ready_pid == getpid():
+            return self.__pool
+
+        with self.__pool_lock:
+            if self.__pool is None or self.__pool_pid != getpid():
+                # The parent's connections are deliberately not closed. Closing 
+                # them would terminate the sessions that the parent still uses.
+                self.__pool = ConnectionPool(
+                    self.__connection_uri if self.__connection_uri is not None else config.DATABASE_URL,
+                    min_size=self.__min_pool_size if self.__min_pool_size is not None else config.DATABASE_POOL_MIN_SIZE,
+                    max_size=self.__max_pool_size if self.__max_pool_size is not None else config.DATABASE_POOL_MAX_SIZE,
+                    timeout=self.__pool_timeout if self.__pool_timeout is not None else config.DATABASE_POOL_TIMEOUT,
+                    setup=self.__configure_connection
+                )
+                self.__pool_pid = getpid()
+
+            # The schema outlives forks, so a child doesn't need to re-launch it. 
+            # Statements issued by ``launch()`` itself re-enter this method.
+            if not self.__schema_launched and not self.__launching:
+                self.__launching = True
+                try:
+                    self.launch()
+                    self.__schema_launched = True
+                finally:
+                    self.__launching = False
+
+            if self.__schema_launched:
+                self.__ready_pid = getpid()
+            return self.__pool
+
+    @staticmethod
+    def __configure_connection(connection):
+        """
+        Set the session variables that the app expects on a new connection.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SET TIME ZONE 'EST';")
+        connection.commit()
+
     def disconnect(self):
         """
-        Close the connection to the database. Should be called before exiting 
-        the script.
+        Close the connections to the database. Should be called before exiting 
+        the script. Connections that were inherited from a parent process are 
+        left alone.
         """
-        self.__connection.close()
+        with self.__pool_lock:
+            if self.__pool is not None and self.__pool_pid == getpid():
+                self.__pool.closeall()
+            self.__pool, self.__pool_pid, self.__ready_pid = None, None, None
+
+    def pool_stats(self):
+        """
+        :return: ``dict``
+
+        Statistics about the underlying connection pool, e.g. the number of 
+        connections that are ``in_use`` or ``idle``, and how long callers have 
+        waited for a connection. See :py:meth:`.ConnectionPool.stats`
+
+        :return: ``NoneType``
+
+        If this process has not connected to the database yet
+        """
+        connection_pool = self.__pool
+        if connection_pool is None or self.__pool_pid != getpid():
+            return None
+        return connection_pool.stats()
     
+    def statement_count(self):
+        """
+        :return: ``int``
+
+        The number of statements that the current thread has sent through this 
+        handle. Comparing two readings tells how many round-trips an operation 
+        costs, e.g. to keep a page from issuing one query per row.
+        """
+        return getattr(self.__local, "num_statements", 0)
+
     def launch(self):
         """
         Initialize the tables if they do not exist yet.
@@ -48,8 +616,7 @@ class Database:
         self.execute((
             "CREATE TABLE IF NOT EXISTS users ("
             "user_id SERIAL PRIMARY KEY, name VARCHAR(255), net_id VARCHAR(255) UNIQUE, "
-            "email VARCHAR(255), phone_num VARCHAR(255), room VARCHAR(255), "
-            "league_ids TEXT);"
+            "email VARCHAR(255), phone_num VARCHAR(255), room VARCHAR(255));"
         ))
 
         self.execute((
@@ -83,6 +650,45 @@ class Database:
             "created_at TIMESTAMPTZ DEFAULT NOW());"
         ))
 
+        self.migrate()
+
+    def migrate(self):
+        """
+        Apply the steps in ``SCHEMA_MIGRATIONS`` that the database hasn't seen 
+        yet, and record them in the ``schema_migrations`` table. Concurrent 
+        callers (e.g. several web workers booting at once) wait on an advisory 
+        lock, so each step runs exactly once.
+
+        :return: ``list[int]``
+
+        The versions that were applied by this call
+        """
+        applied_now = []
+        with self.transaction():
+            self.execute(
+                "SELECT pg_advisory_xact_lock(%s);", values=[SCHEMA_MIGRATIONS_LOCK_ID]
+            )
+            self.execute((
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INT PRIMARY KEY, description TEXT, "
+                "applied_at TIMESTAMPTZ DEFAULT NOW());"
+            ))
+            applied_versions = {
+                row["version"] for row in self.execute("SELECT version FROM schema_migrations;")
+            }
+
+            for version, description, statements in SCHEMA_MIGRATIONS:
+                if version in applied_versions: continue
+                for statement in statements:
+                    self.execute(statement)
+                self.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+                    values=[version, description]
+                )
+                applied_now.append(version)
+
+        return applied_now
+
     def execute(self, statement, values=None, dynamic_table_or_column_names=None, 
                 cursor_factory=extras.DictCursor):
         """
@@ -111,11 +717,11 @@ class Database:
         
         If the SQL transaction fails, the transaction is rolled back. The most 
         recently executed query is printed to ``sys.stderr``. The error is then 
-        raised.
+        raised. Inside :py:meth:`.transaction`, the whole transaction is rolled 
+        back once the error propagates out of the ``with`` block.
 
         """
-        cursor = self.__connection.cursor(cursor_factory=cursor_factory)
-        try:
+        def run_statement(cursor):
             if dynamic_table_or_column_names:
                 cursor.execute(
                     sql.SQL(statement).format(*[
@@ -125,15 +731,11 @@ class Database:
                 )
             else: 
                 cursor.execute(statement, values)
-            self.__connection.commit()
-            return cursor
-        except:
-            print("\nLast Query:", cursor.query, "\n", file=stderr)
-            self.__connection.rollback()
-            raise
+
+        return self.__run(run_statement, cursor_factory)
 
     def execute_many(self, sql_query, values, dynamic_table_or_column_names=None, 
-                     cursor_factory=extras.DictCursor):
+                     cursor_factory=extras.DictCursor, page_size=100):
         """
         Execute many related SQL queries, e.g. update several rows of a table.
 
@@ -155,6 +757,12 @@ class Database:
         The type of object that should be generated by calls to the ``cursor()`` 
         method.
 
+        :kwarg page_size: int
+
+        The maximum number of items sent per statement. Queries with a 
+        ``RETURNING`` clause should send all the items at once, since the 
+        cursor only holds the rows returned by the last statement.
+
         :return: ``cursor``
         
         The cursor after after executing the SQL query
@@ -163,7 +771,8 @@ class Database:
         
         If the SQL transaction fails, the transaction is rolled back. The most 
         recently executed query is printed to ``sys.stderr``. The error is then 
-        raised.
+        raised. Inside :py:meth:`.transaction`, the whole transaction is rolled 
+        back once the error propagates out of the ``with`` block.
 
         """
         if dynamic_table_or_column_names is not None:
@@ -171,20 +780,182 @@ class Database:
                 sql.Identifier(s) for s in dynamic_table_or_column_names
             ])
 
-        cursor = self.__connection.cursor(cursor_factory=cursor_factory)
         if values and isinstance(values[0], dict):
             template = "({})".format(", ".join(["%({})s".format(x) for x in values[0].keys()]))
         else:
             template = None
 
+        return self.__run(
+            lambda cursor: extras.execute_values(
+                cursor, sql_query, values, template=template, page_size=page_size
+            ),
+            cursor_factory
+        )
+
+    def copy_records(self, table_name, column_names, records, encoded=False):
+        """
+        Bulk-insert rows using ``COPY ... FROM STDIN``. This is much faster than 
+        issuing an ``INSERT`` per row, or even :py:meth:`.execute_many`, when 
+        writing thousands of rows.
+
+        :param table_name: str
+
+        The table into which the rows will be inserted
+
+        :param column_names: list[str]
+
+        The names of the columns that each record provides values for
+
+        :param records: iterable
+
+        Each item is a sequence of values, ordered like ``column_names``. 
+        ``None`` is written as ``NULL``. The records are consumed lazily, so a 
+        generator never needs to hold all of them at once.
+
+        :kwarg encoded: bool
+
+        If ``True``, each item of ``records`` is a string that's already in 
+        ``COPY``'s text format, as described in :py:class:`.RecordsReader`
+
+        :return: ``int``
+
+        The number of rows that were inserted
+
+        :raise: ``psycopg2.errors``
+
+        If the ``COPY`` fails. The error is handled like in :py:meth:`.execute`
+
+        """
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join([sql.Identifier(x) for x in column_names])
+        )
+        # The records are encoded as COPY reads them, so generators are 
+        # streamed rather than materialized
+        reader = RecordsReader(records, encoded=encoded)
+        self.__run(
+            lambda cursor: cursor.copy_expert(statement, reader), extras.DictCursor
+        )
+        return reader.num_records
+
+    def __run(self, run_statement, cursor_factory):
+        """
+        Run ``run_statement(cursor)`` on the connection that is bound to the 
+        current :py:meth:`.transaction`. If there's no such transaction, check 
+        out a connection and commit right after the statement.
+
+        :return: ``cursor``
+
+        The cursor that was passed to ``run_statement``
+        """
+        self.__local.num_statements = self.statement_count() + 1
+        connection = getattr(self.__local, "connection", None)
+        if connection is not None:
+            cursor = connection.cursor(cursor_factory=cursor_factory)
+            try:
+                run_statement(cursor)
+                return cursor
+            except:
+                # The enclosing transaction is responsible for the rollback
+                print("\nLast Query:", cursor.query, "\n", file=stderr)
+                raise
+
+        connection_pool = self.__get_pool()
+        connection = connection_pool.getconn()
+        cursor = connection.cursor(cursor_factory=cursor_factory)
         try:
-            extras.execute_values(cursor, sql_query, values, template=template)
-            self.__connection.commit()
+            run_statement(cursor)
+            connection.commit()
             return cursor
         except:
             print("\nLast Query:", cursor.query, "\n", file=stderr)
-            self.__connection.rollback()
+            self.__rollback(connection)
             raise
+        finally:
+            connection_pool.putconn(connection)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group several statements into a single unit of work, e.g.
+
+        .. code-block:: python
+
+            with db.transaction():
+                db.execute("INSERT INTO ...")
+                db.execute("UPDATE ...")
+
+        Within the ``with`` block, every statement that the current thread 
+        issues through this instance runs on the same connection and nothing 
+        is committed until the block exits. If the block raises, all of its 
+        statements are rolled back. Nested ``with db.transaction()`` blocks 
+        join the outermost one.
+
+        Once a statement fails, Postgres rejects the rest of the transaction, so 
+        let the exception propagate out of the block rather than catching it 
+        inside.
+
+        :yield: ``Database``
+
+        This instance
+
+        """
+        if getattr(self.__local, "connection", None) is not None:
+            yield self
+            return
+
+        connection_pool = self.__get_pool()
+        connection = connection_pool.getconn()
+        self.__local.connection = connection
+        self.__local.after_commit_callbacks = []
+        try:
+            yield self
+            connection.commit()
+        except:
+            self.__rollback(connection)
+            raise
+        finally:
+            callbacks = self.__local.after_commit_callbacks
+            self.__local.connection = None
+            self.__local.after_commit_callbacks = []
+            connection_pool.putconn(connection)
+
+        for callback in callbacks:
+            callback()
+
+    def in_transaction(self):
+        """
+        :return: ``bool``
+
+        ``True`` if the current thread is inside a :py:meth:`.transaction`, 
+        i.e. what it reads may not be committed yet
+        """
+        return getattr(self.__local, "connection", None) is not None
+
+    def call_after_commit(self, callback):
+        """
+        Call ``callback()`` once the current thread's :py:meth:`.transaction` 
+        commits, e.g. to drop cached data that the transaction changes. Outside 
+        of a transaction, the statements are already committed, so the callback 
+        is called right away. If the transaction is rolled back, it's never called.
+
+        :param callback: function
+
+        A function that takes no arguments
+        """
+        if not self.in_transaction():
+            callback()
+        else:
+            self.__local.after_commit_callbacks.append(callback)
+
+    @staticmethod
+    def __rollback(connection):
+        """
+        Roll back the current transaction, unless the connection has been lost, 
+        in which case the pool will discard it once it's returned.
+        """
+        if not connection.closed:
+            connection.rollback()
             
     def iterator(self, cursor):
         """
@@ -212,3 +983,9 @@ class Database:
         while row is not None:
             yield row
             row = cursor.fetchone()
+
+db = Database()
+"""
+The database handle that's shared by the whole app. Importing it is free; the 
+connections are opened when the first statement is executed.
+"""
@@ -6,8 +6,8 @@ Exposes a blueprint that handles requests made to `/league/*` endpoint
 """
 
 import json
-from datetime import date, timedelta
-from math import ceil, inf
+from datetime import date
+from math import inf
 from collections import defaultdict
 from functools import cmp_to_key
 
@@ -33,9 +33,9 @@ LEAGUE_STAGE_IN_PLAYOFFS = "in_playoffs"
 MATCH_STATUS_APPROVED = "approved"
 MATCH_STATUS_PENDING_APPROVAL = "pending_approval"
 
-db = db_model.Database()
+db = db_model.db
 
-def update_league_standings(league_id, division_id):
+def update_league_standings(league_id, division_id, aggregate_in_database=False):
     """
     Compute the new league standings and persist them into the database.
 
@@ -47,120 +47,353 @@ def update_league_standings(league_id, division_id):
     
     The ID of the division within the league of interest
 
+    :kwarg aggregate_in_database: bool
+
+    If ``True``, the standings are computed and written by a single aggregate 
+    query on the database server, instead of streaming every approved match 
+    into Python. The results are identical; this is faster for big divisions.
+
     :return: ``NoneType``
 
     This method affects the state of the database. It doesn't return anything. 
     To fetch the standings, call :py:meth:`.get_league_standings` instead.
     """
-    cursor = db.execute(
-        (
-            "SELECT points_per_win, points_per_draw, points_per_loss "
-            "FROM league_info WHERE league_id = %s"
-        ),
-        values=[league_id]
-    )
-    row = cursor.fetchone()
+    # Locking the league's row serializes concurrent recomputations, so that a 
+    # slower one cannot overwrite standings that include a newer score
+    with db.transaction():
+        cursor = db.execute(
+            (
+                "SELECT points_per_win, points_per_draw, points_per_loss "
+                "FROM league_info WHERE league_id = %s FOR UPDATE"
+            ),
+            values=[league_id]
+        )
+        row = cursor.fetchone()
 
-    points_per_win = row['points_per_win']
-    points_per_draw = row['points_per_draw']
-    points_per_loss = row['points_per_loss']
+        if aggregate_in_database:
+            return __aggregate_league_standings(league_id, division_id, row)
 
-    div_standings_info = {}
-    cursor = db.execute(
-        "SELECT user_id FROM {} WHERE division_id = %s;", values=[division_id],
-        dynamic_table_or_column_names=["league_responses_{}".format(league_id)]
-    )
-    for row in cursor:
-        div_standings_info[row["user_id"]] = {
-            "games_played": 0, "goals_for": 0, "goals_allowed": 0, "wins": 0, 
-            "draws": 0, "losses": 0, "points": 0, "user_id": row["user_id"]
-        }
+        points_per_win = row['points_per_win']
+        points_per_draw = row['points_per_draw']
+        points_per_loss = row['points_per_loss']
 
-    cursor = db.execute(
-        (
-            "SELECT match_id, user_1_id, user_2_id, score_user_1, score_user_2 "
-            "FROM match_info WHERE league_id = %s AND division_id = %s AND status = %s;"
-        ),
-        values=[league_id, division_id, MATCH_STATUS_APPROVED]
-    )
+        div_standings_info = {}
+        # Ties are broken by user ID, the same way as in 
+        # :py:meth:`.update_league_standings_for_match`
+        cursor = db.execute(
+            (
+                "SELECT user_id FROM league_memberships "
+                "WHERE league_id = %s AND division_id = %s ORDER BY user_id;"
+            ),
+            values=[league_id, division_id]
+        )
+        for row in cursor:
+            div_standings_info[row["user_id"]] = {
+                "games_played": 0, "goals_for": 0, "goals_allowed": 0, "wins": 0, 
+                "draws": 0, "losses": 0, "points": 0, "user_id": row["user_id"]
+            }
+
+        cursor = db.execute(
+            (
+                "SELECT match_id, user_1_id, user_2_id, score_user_1, score_user_2 "
+                "FROM match_info WHERE league_id = %s AND division_id = %s AND status = %s;"
+            ),
+            values=[league_id, division_id, MATCH_STATUS_APPROVED]
+        )
     
-    for row in cursor:
-        user_1_id = row['user_1_id']
-        user_2_id = row['user_2_id']
-        if user_1_id is None or user_2_id is None: continue
+        for row in cursor:
+            user_1_id = row['user_1_id']
+            user_2_id = row['user_2_id']
+            if user_1_id is None or user_2_id is None: continue
 
-        div_standings_info[user_1_id]['games_played'] += 1
-        div_standings_info[user_2_id]['games_played'] += 1
+            div_standings_info[user_1_id]['games_played'] += 1
+            div_standings_info[user_2_id]['games_played'] += 1
 
-        div_standings_info[user_1_id]['goals_for'] += row['score_user_1']
-        div_standings_info[user_2_id]['goals_for'] += row['score_user_2']
+            div_standings_info[user_1_id]['goals_for'] += row['score_user_1']
+            div_standings_info[user_2_id]['goals_for'] += row['score_user_2']
 
-        div_standings_info[user_1_id]['goals_allowed'] += row['score_user_2']
-        div_standings_info[user_2_id]['goals_allowed'] += row['score_user_1']
+            div_standings_info[user_1_id]['goals_allowed'] += row['score_user_2']
+            div_standings_info[user_2_id]['goals_allowed'] += row['score_user_1']
         
-        if (row['score_user_1'] > row['score_user_2']):
-            div_standings_info[user_1_id]['wins'] += 1
-            div_standings_info[user_1_id]['points'] += points_per_win
-            div_standings_info[user_2_id]['losses'] += 1
-            div_standings_info[user_2_id]['points'] += points_per_loss
-        elif (row['score_user_1'] < row['score_user_2']):
-            div_standings_info[user_2_id]['wins'] += 1
-            div_standings_info[user_2_id]['points'] += points_per_win
-            div_standings_info[user_1_id]['losses'] += 1
-            div_standings_info[user_1_id]['points'] += points_per_loss
-        else:
-            div_standings_info[user_1_id]['draws'] += 1
-            div_standings_info[user_1_id]['points'] += points_per_draw
-            div_standings_info[user_2_id]['draws'] += 1
-            div_standings_info[user_2_id]['points'] += points_per_draw
-
-    for user_id in div_standings_info:
-        div_standings_info[user_id]['goal_diff'] = div_standings_info[user_id]['goals_for'] \
-             - div_standings_info[user_id]['goals_allowed']
+            if (row['score_user_1'] > row['score_user_2']):
+                div_standings_info[user_1_id]['wins'] += 1
+                div_standings_info[user_1_id]['points'] += points_per_win
+                div_standings_info[user_2_id]['losses'] += 1
+                div_standings_info[user_2_id]['points'] += points_per_loss
+            elif (row['score_user_1'] < row['score_user_2']):
+                div_standings_info[user_2_id]['wins'] += 1
+                div_standings_info[user_2_id]['points'] += points_per_win
+                div_standings_info[user_1_id]['losses'] += 1
+                div_standings_info[user_1_id]['points'] += points_per_loss
+            else:
+                div_standings_info[user_1_id]['draws'] += 1
+                div_standings_info[user_1_id]['points'] += points_per_draw
+                div_standings_info[user_2_id]['draws'] += 1
+                div_standings_info[user_2_id]['points'] += points_per_draw
+
+        for user_id in div_standings_info:
+            div_standings_info[user_id]['goal_diff'] = div_standings_info[user_id]['goals_for'] \
+                 - div_standings_info[user_id]['goals_allowed']
         
-    def standings_cmp(a, b):
-        """
-        A comparator function for sorting the standings
-        """
-        if a["points"] > b["points"]: return 1
-        if a["points"] < b["points"]: return -1
+        def standings_cmp(a, b):
+            """
+            A comparator function for sorting the standings
+            """
+            if a["points"] > b["points"]: return 1
+            if a["points"] < b["points"]: return -1
         
-        if a["goal_diff"] > b["goal_diff"]: return 1
-        if a["goal_diff"] < b["goal_diff"]: return -1
-        return a["losses"] + a["draws"] + a["wins"] - b["losses"] - b["draws"] - b["wins"]
-
-    standings = [x for x in div_standings_info.values()]
-    standings.sort(key=cmp_to_key(standings_cmp), reverse=True)
-    for rank, standing in enumerate(standings, 1): 
-        standing["rank"] = rank
-        standing["division_id"] = division_id
-        standing["league_id"] = league_id
-        div_standings_info[standing["user_id"]] = standing
-
-    # Persist the standings in the database
+            if a["goal_diff"] > b["goal_diff"]: return 1
+            if a["goal_diff"] < b["goal_diff"]: return -1
+            return a["losses"] + a["draws"] + a["wins"] - b["losses"] - b["draws"] - b["wins"]
+
+        standings = [x for x in div_standings_info.values()]
+        standings.sort(key=cmp_to_key(standings_cmp), reverse=True)
+        for rank, standing in enumerate(standings, 1): 
+            standing["rank"] = rank
+            standing["division_id"] = division_id
+            standing["league_id"] = league_id
+            div_standings_info[standing["user_id"]] = standing
+
+        # Persist the standings in the database
+        cursor = db.execute(
+            "SELECT rank, user_id FROM league_standings WHERE league_id = %s AND division_id = %s;",
+            values=[league_id, division_id]
+        )
+        for row in cursor:
+            if row["rank"] is not None:
+                div_standings_info[row["user_id"]]["rank_delta"] = row["rank"] - div_standings_info[row["user_id"]]["rank"]
+            else:
+                div_standings_info[row["user_id"]]["rank_delta"] = None
+
+        standings_list = list(div_standings_info.values())
+        if standings_list:
+            db.execute(
+                "DELETE FROM league_standings WHERE league_id = %s AND division_id = %s;",
+                values=[league_id, division_id]
+            )
+            db.execute_many(
+                "INSERT INTO league_standings ({}) VALUES %s;".format(
+                    ", ".join(standings_list[0].keys())
+                ), values=standings_list
+            )
+
+    return div_standings_info
+
+def __aggregate_league_standings(league_id, division_id, points_per_outcome):
+    """
+    Replace the division's standings with ones computed by a single query. The 
+    players are ordered in the same way as in :py:meth:`.update_league_standings`
+
+    :param league_id: int
+
+    The ID of the league
+
+    :param division_id: int
+
+    The ID of the division within the league
+
+    :param points_per_outcome: dict
+
+    Keyed by ``points_per_win``, ``points_per_draw`` and ``points_per_loss``
+
+    :return: ``dict[dict]``
+
+    The new standings, keyed by the user ID
+
+    """
+    query_values = dict(league_id=league_id, division_id=division_id, **points_per_outcome)
+    query_values["approved"] = MATCH_STATUS_APPROVED
     cursor = db.execute(
-        "SELECT rank, user_id FROM league_standings WHERE league_id = %s AND division_id = %s;",
-        values=[league_id, division_id]
+        (
+            "WITH previous AS ("
+            "    DELETE FROM league_standings "
+            "    WHERE league_id = %(league_id)s AND division_id = %(division_id)s "
+            "    RETURNING user_id, rank"
+            "), approved_matches AS ("
+            "    SELECT user_1_id, user_2_id, score_user_1, score_user_2 FROM match_info "
+            "    WHERE league_id = %(league_id)s AND division_id = %(division_id)s "
+            "    AND status = %(approved)s AND user_1_id IS NOT NULL AND user_2_id IS NOT NULL"
+            "), sides AS ("
+            "    SELECT user_1_id AS user_id, score_user_1 AS goals_for, score_user_2 AS goals_allowed "
+            "    FROM approved_matches "
+            "    UNION ALL "
+            "    SELECT user_2_id, score_user_2, score_user_1 FROM approved_matches"
+            "), totals AS ("
+            "    SELECT members.user_id, COUNT(sides.user_id) AS games_played, "
+            "    COUNT(*) FILTER (WHERE sides.goals_for > sides.goals_allowed) AS wins, "
+            "    COUNT(*) FILTER (WHERE sides.goals_for < sides.goals_allowed) AS losses, "
+            "    COUNT(*) FILTER (WHERE sides.goals_for = sides.goals_allowed) AS draws, "
+            "    COALESCE(SUM(sides.goals_for), 0) AS goals_for, "
+            "    COALESCE(SUM(sides.goals_allowed), 0) AS goals_allowed "
+            "    FROM league_memberships AS members LEFT JOIN sides ON sides.user_id = members.user_id "
+            "    WHERE members.league_id = %(league_id)s AND members.division_id = %(division_id)s "
+            "    GROUP BY members.user_id"
+            "), scored AS ("
+            "    SELECT totals.*, goals_for - goals_allowed AS goal_diff, "
+            "    wins * %(points_per_win)s + draws * %(points_per_draw)s "
+            "    + losses * %(points_per_loss)s AS points FROM totals"
+            "), ranked AS ("
+            "    SELECT scored.*, ROW_NUMBER() OVER ("
+            "        ORDER BY points DESC, goal_diff DESC, games_played DESC, user_id ASC"
+            "    ) AS rank FROM scored"
+            ") "
+            "INSERT INTO league_standings ("
+            "league_id, division_id, user_id, wins, losses, draws, games_played, "
+            "goals_for, goals_allowed, goal_diff, points, rank, rank_delta) "
+            "SELECT %(league_id)s, %(division_id)s, ranked.user_id, wins, losses, draws, "
+            "games_played, goals_for, goals_allowed, goal_diff, points, ranked.rank, "
+            "previous.rank - ranked.rank "
+            "FROM ranked LEFT JOIN previous ON previous.user_id = ranked.user_id "
+            "RETURNING *;"
+        ),
+        values=query_values
     )
-    for row in cursor:
-        if row["rank"] is not None:
-            div_standings_info[row["user_id"]]["rank_delta"] = row["rank"] - div_standings_info[row["user_id"]]["rank"]
-        else:
-            div_standings_info[row["user_id"]]["rank_delta"] = None
+    return {row["user_id"]: dict(**row) for row in cursor}
+
+STANDINGS_COUNTERS = [
+    "wins", "losses", "draws", "games_played", "goals_for", "goals_allowed", 
+    "goal_diff", "points"
+]
+
+def __match_standings_contribution(match, points_per_outcome, sign=1):
+    """
+    :param match: dict
+
+    Expected keys: ``user_1_id``, ``user_2_id``, ``score_user_1``, ``score_user_2``
+
+    :param points_per_outcome: dict
+
+    Keyed by ``points_per_win``, ``points_per_draw`` and ``points_per_loss``
+
+    :kwarg sign: int
+
+    ``1`` to add the match to the standings, ``-1`` to take it out
+
+    :return: ``dict[dict]``
+
+    Keyed by the IDs of the two players. Each value maps the columns in 
+    ``STANDINGS_COUNTERS`` to how much the match changes them.
+
+    """
+    contribution = {}
+    for user_id, goals_for, goals_allowed in [
+            (match["user_1_id"], match["score_user_1"], match["score_user_2"]),
+            (match["user_2_id"], match["score_user_2"], match["score_user_1"])]:
+        if goals_for > goals_allowed: outcome = "wins"
+        elif goals_for < goals_allowed: outcome = "losses"
+        else: outcome = "draws"
+
+        delta = {counter: 0 for counter in STANDINGS_COUNTERS}
+        delta[outcome] = sign
+        delta["games_played"] = sign
+        delta["goals_for"] = sign * goals_for
+        delta["goals_allowed"] = sign * goals_allowed
+        delta["goal_diff"] = sign * (goals_for - goals_allowed)
+        delta["points"] = sign * points_per_outcome["points_per_{}".format(
+            {"wins": "win", "losses": "loss", "draws": "draw"}[outcome]
+        )]
+        contribution[user_id] = delta
+
+    return contribution
+
+def update_league_standings_for_match(previous_match, updated_match):
+    """
+    Apply the change in a single match's result onto the persisted standings. 
+    This is much cheaper than :py:meth:`.update_league_standings`, which reads 
+    every approved match in the division. Only the two players' rows are 
+    updated before the division is re-ranked.
+
+    :param previous_match: dict
+
+    The match as it was before the update. Expected keys: ``league_id``, 
+    ``division_id``, ``user_1_id``, ``user_2_id``, ``score_user_1``, 
+    ``score_user_2``, ``status``
+
+    :param updated_match: dict
+
+    The match after the update. Expected keys: ``score_user_1``, 
+    ``score_user_2``, ``status``
+
+    :return: ``NoneType``
 
-    standings_list = list(div_standings_info.values())
-    if standings_list:
+    If the players have no standings yet, the division's standings are 
+    recomputed from scratch instead.
+
+    """
+    if previous_match["user_1_id"] is None or previous_match["user_2_id"] is None:
+        return
+
+    league_id = previous_match["league_id"]
+    division_id = previous_match["division_id"]
+
+    with db.transaction():
+        points_per_outcome = db.execute(
+            (
+                "SELECT points_per_win, points_per_draw, points_per_loss "
+                "FROM league_info WHERE league_id = %s FOR UPDATE"
+            ),
+            values=[league_id]
+        ).fetchone()
+
+        deltas = {
+            previous_match["user_1_id"]: defaultdict(int), 
+            previous_match["user_2_id"]: defaultdict(int)
+        }
+        if previous_match["status"] == MATCH_STATUS_APPROVED:
+            for user_id, delta in __match_standings_contribution(
+                    previous_match, points_per_outcome, sign=-1).items():
+                for counter, value in delta.items(): deltas[user_id][counter] += value
+        
+        if updated_match["status"] == MATCH_STATUS_APPROVED:
+            for user_id, delta in __match_standings_contribution(
+                    dict(previous_match, **updated_match), points_per_outcome).items():
+                for counter, value in delta.items(): deltas[user_id][counter] += value
+
+        if not any(any(delta.values()) for delta in deltas.values()): return
+
+        cursor = db.execute_many(
+            (
+                "UPDATE league_standings SET {} FROM (VALUES %s) AS delta ("
+                "league_id, division_id, user_id, {}) "
+                "WHERE league_standings.league_id = delta.league_id "
+                "AND league_standings.division_id = delta.division_id "
+                "AND league_standings.user_id = delta.user_id "
+                "RETURNING league_standings.user_id;"
+            ).format(
+                ", ".join(
+                    "{0} = league_standings.{0} + delta.{0}".format(counter) 
+                    for counter in STANDINGS_COUNTERS
+                ),
+                ", ".join(STANDINGS_COUNTERS)
+            ),
+            [
+                tuple([league_id, division_id, user_id] + [delta[c] for c in STANDINGS_COUNTERS])
+                for user_id, delta in deltas.items()
+            ]
+        )
+        if len(cursor.fetchall()) < len(deltas):
+            # The standings were never initialized for these players
+            update_league_standings(league_id, division_id)
+            return
+
+        # Re-rank the division. Only the rows whose rank changed, or whose rank 
+        # moved at the previous update, need to be written
         db.execute(
-            "DELETE FROM league_standings WHERE league_id = %s AND division_id = %s;",
+            (
+                "UPDATE league_standings "
+                "SET rank = ranked.new_rank, rank_delta = league_standings.rank - ranked.new_rank "
+                "FROM ("
+                "    SELECT standing_id, ROW_NUMBER() OVER ("
+                "        ORDER BY points DESC, goal_diff DESC, games_played DESC, user_id ASC"
+                "    ) AS new_rank FROM league_standings "
+                "    WHERE league_id = %s AND division_id = %s"
+                ") AS ranked "
+                "WHERE league_standings.standing_id = ranked.standing_id "
+                "AND (league_standings.rank IS DISTINCT FROM ranked.new_rank "
+                "OR league_standings.rank_delta IS DISTINCT FROM league_standings.rank - ranked.new_rank);"
+            ),
             values=[league_id, division_id]
         )
-        db.execute_many(
-            "INSERT INTO league_standings ({}) VALUES %s;".format(
-                ", ".join(standings_list[0].keys())
-            ), values=standings_list
-        )
-
-    return div_standings_info
 
 def get_league_standings(league_id):
     """
@@ -223,84 +456,55 @@ def get_matches_in_current_window(league_id, num_periods_before=3,
     A list of all the matches within the current time window. These are the 
     matches that are about to be played or have been played. Keys include: 
     ```match_id``` ```user_1_id```, ```user_2_id```, ```league_id```, ```division_id```, 
-    ```score_user_1```, ```score_user_2```, ```status```, ```deadline```
+    ```score_user_1```, ```score_user_2```, ```status```, ```deadline```, 
+    ```user_1_name```, ```user_2_name```, ```recent_updater_name```
     """
-    cursor = db.execute(
-        "SELECT num_games_per_period, length_period_in_days FROM league_info WHERE league_id = %s;", 
-        values=[league_id]
+    # One round-trip: the window is computed from the league's settings in the 
+    # same query that fetches the matches and the players' names. The matches 
+    # are LEFT JOINed so that an existing league without matches still yields 
+    # a row, which tells it apart from a league that doesn't exist. An infinite 
+    # window has no bound on that side, since it extends to the earliest (or 
+    # latest) deadline of the league anyway.
+    window_days = (
+        "CEIL(league_info.length_period_in_days::NUMERIC / league_info.num_games_per_period)::INT"
     )
-
-    row = cursor.fetchone()
-    if row is None:
-        raise TigerLeaguesException('League does not exist; it may have been deleted. \
-        If you entered the URL manually, double-check the league ID.', jsonify=False)
-    
-    time_window_days = ceil(row["length_period_in_days"] / row["num_games_per_period"])
-
-    date_limits = db.execute(
-        "SELECT min(deadline), max(deadline) FROM match_info WHERE league_id = %s;",
-        values=[league_id]
-    ).fetchone()
-
-    
-    today = date.today()
-    if num_periods_before == inf:
-        try:
-            earliest_date = min(today, date_limits["min"])
-        except TypeError:
-            earliest_date = today
-    else:
-        earliest_date = date.today() - timedelta(days=time_window_days * num_periods_before)
-
-    if num_periods_after == inf:
-        try: 
-            latest_date = max(today, date_limits["max"])
-        except TypeError:
-            latest_date = today
-    else:
-        latest_date = date.today() + timedelta(days=time_window_days * num_periods_after)
-    
+    conditions = [
+        "match_info.league_id = league_info.league_id",
+        "(user_1_id IS NOT NULL AND user_2_id IS NOT NULL)"
+    ]
+    if num_periods_before != inf:
+        conditions.append(
+            "deadline >= %(today)s::DATE - {} * %(num_periods_before)s".format(window_days)
+        )
+    if num_periods_after != inf:
+        conditions.append(
+            "deadline <= %(today)s::DATE + {} * %(num_periods_after)s".format(window_days)
+        )
     if user_id is not None:
-        matches = db.execute(
-            (
-                "SELECT match_info.*, NULL as recent_updater_name FROM match_info "
-                "WHERE league_id = %s AND (user_1_id = %s OR user_2_id = %s) "
-                "AND (user_1_id IS NOT NULL AND user_2_id IS NOT NULL) "
-                "AND deadline >= %s AND deadline <= %s ORDER BY deadline;"
-            ),
-            values=[league_id, user_id, user_id, earliest_date, latest_date]
-        ).fetchall()
+        conditions.append("(user_1_id = %(user_id)s OR user_2_id = %(user_id)s)")
 
-    else:  
-        matches = db.execute(
-            (
-                "SELECT match_info.*, NULL as recent_updater_name FROM match_info "
-                "WHERE league_id = %s "
-                "AND (user_1_id IS NOT NULL AND user_2_id IS NOT NULL) "
-                "AND deadline >= %s AND deadline <= %s ORDER BY deadline;"
-            ),
-            values=[league_id, earliest_date, latest_date]
-        ).fetchall()
-
-    user_name_results = db.execute(
+    rows = db.execute(
         (
-            "SELECT users.name, users.user_id FROM users, match_info "
-            "WHERE users.user_id = match_info.recent_updater_id "
-            "AND match_info.league_id = %s AND deadline >= %s AND deadline <= %s;"
-        ),
-        values=[league_id, earliest_date, latest_date]
-    )
-
-    user_ids_to_name_mapping = {}
-    for result in user_name_results:
-        user_ids_to_name_mapping[result["user_id"]] = result["name"]
+            "SELECT match_info.*, user_1.name AS user_1_name, user_2.name AS user_2_name, "
+            "recent_updater.name AS recent_updater_name FROM league_info "
+            "LEFT JOIN match_info ON {} "
+            "LEFT JOIN users AS user_1 ON user_1.user_id = match_info.user_1_id "
+            "LEFT JOIN users AS user_2 ON user_2.user_id = match_info.user_2_id "
+            "LEFT JOIN users AS recent_updater ON recent_updater.user_id = match_info.recent_updater_id "
+            "WHERE league_info.league_id = %(league_id)s ORDER BY deadline;"
+        ).format(" AND ".join(conditions)),
+        values={
+            "league_id": league_id, "user_id": user_id, "today": date.today(),
+            "num_periods_before": None if num_periods_before == inf else int(num_periods_before),
+            "num_periods_after": None if num_periods_after == inf else int(num_periods_after)
+        }
+    ).fetchall()
 
-    for match in matches:
-        match["recent_updater_name"] = user_ids_to_name_mapping.get(
-            match["recent_updater_id"], None
-        )
+    if not rows:
+        raise TigerLeaguesException('League does not exist; it may have been deleted. \
+        If you entered the URL manually, double-check the league ID.', jsonify=False)
 
-    return matches
+    return [row for row in rows if row["match_id"] is not None]
 
 def get_players_current_matches(user_id, league_id, num_periods_before=4, 
                                 num_periods_after=4):
@@ -347,22 +551,17 @@ def get_players_current_matches(user_id, league_id, num_periods_before=4,
         mutable_match = dict(**match)
         if match["user_1_id"] != user_id: 
             mutable_match["opponent_id"] = match["user_1_id"]
+            mutable_match["opponent_name"] = match["user_1_name"]
             mutable_match["opponent_score"] = match['score_user_1']
             mutable_match["my_score"] = match['score_user_2']
         else: 
             mutable_match["opponent_id"] = match["user_2_id"]
+            mutable_match["opponent_name"] = match["user_2_name"]
             mutable_match["opponent_score"] = match['score_user_2']
             mutable_match["my_score"] = match['score_user_1']
 
         current_matches.append(mutable_match)
 
-    for match in current_matches:
-        cursor = db.execute(
-            "SELECT name FROM users WHERE user_id = %s",
-            values=[match["opponent_id"]]
-        )
-        match["opponent_name"] = cursor.fetchone()["name"]
-
     return current_matches
 
 def process_player_score_report(user_id, score_details):
@@ -390,46 +589,50 @@ def process_player_score_report(user_id, score_details):
         ]
     )
 
-    previous_match_details = db.execute(
-        "SELECT * FROM match_info WHERE match_id = %s", 
-        values=[score_details["match_id"]]
-    ).fetchone()
-    mapping = {}
-    if previous_match_details["user_1_id"] == user_id:
-        mapping["my_score"] = "score_user_1"
-        mapping["score_user_1"] = "my_score"
-        mapping["opponent_score"] = "score_user_2"
-        mapping["score_user_2"] = "opponent_score"
-    else:
-        mapping["my_score"] = "score_user_2"
-        mapping["score_user_2"] = "my_score"
-        mapping["opponent_score"] = "score_user_1"
-        mapping["score_user_1"] = "opponent_score"
+    with db.transaction():
+        previous_match_details = db.execute(
+            "SELECT * FROM match_info WHERE match_id = %s FOR UPDATE", 
+            values=[score_details["match_id"]]
+        ).fetchone()
+        mapping = {}
+        if previous_match_details["user_1_id"] == user_id:
+            mapping["my_score"] = "score_user_1"
+            mapping["score_user_1"] = "my_score"
+            mapping["opponent_score"] = "score_user_2"
+            mapping["score_user_2"] = "opponent_score"
+        else:
+            mapping["my_score"] = "score_user_2"
+            mapping["score_user_2"] = "my_score"
+            mapping["opponent_score"] = "score_user_1"
+            mapping["score_user_1"] = "opponent_score"
     
-    if previous_match_details["recent_updater_id"] != user_id and \
-        previous_match_details[mapping["my_score"]] == score_details["my_score"] and \
-        previous_match_details[mapping["opponent_score"]] == score_details["opponent_score"]:
-        match_status = MATCH_STATUS_APPROVED
-    else:
-        match_status = MATCH_STATUS_PENDING_APPROVAL
+        if previous_match_details["recent_updater_id"] != user_id and \
+            previous_match_details[mapping["my_score"]] == score_details["my_score"] and \
+            previous_match_details[mapping["opponent_score"]] == score_details["opponent_score"]:
+            match_status = MATCH_STATUS_APPROVED
+        else:
+            match_status = MATCH_STATUS_PENDING_APPROVAL
 
-    db.execute(
-        (
-            "UPDATE match_info "
-            "SET score_user_1 = %s, score_user_2 = %s, status = %s, recent_updater_id = %s "
-            "WHERE match_id = %s"
-        ),
-        values=[
-            score_details[mapping["score_user_1"]], score_details[mapping["score_user_2"]],
-            match_status, user_id, score_details["match_id"]
-        ]
-    )
+        db.execute(
+            (
+                "UPDATE match_info "
+                "SET score_user_1 = %s, score_user_2 = %s, status = %s, recent_updater_id = %s "
+                "WHERE match_id = %s"
+            ),
+            values=[
+                score_details[mapping["score_user_1"]], score_details[mapping["score_user_2"]],
+                match_status, user_id, score_details["match_id"]
+            ]
+        )
 
-    # If the score has been approved update the standings
-    if match_status == MATCH_STATUS_APPROVED:
-        update_league_standings(
-            previous_match_details["league_id"],
-            previous_match_details["division_id"]
+        # Apply the result to the standings. A previously approved score that 
+        # is now disputed is taken back out
+        update_league_standings_for_match(
+            previous_match_details, {
+                "score_user_1": score_details[mapping["score_user_1"]],
+                "score_user_2": score_details[mapping["score_user_2"]],
+                "status": match_status
+            }
         )
 
     return {"success": True, "message": {"match_status": match_status}}
@@ -524,54 +727,27 @@ def create_league(league_info, creator_user_id):
         "additional_questions": json.dumps(sanitized_additional_questions)
     }
     keys_in_order = list(league_basics.keys())
-    cursor = db.execute(
-        "INSERT INTO league_info ({}) VALUES ({}) RETURNING league_id;".format(
-            ", ".join(["{}" for _ in keys_in_order]),
-            ", ".join(["%({})s".format(key) for key in keys_in_order])
-        ),
-        dynamic_table_or_column_names=keys_in_order,
-        values=league_basics
-    )
-    league_id = cursor.fetchone()["league_id"]
+    with db.transaction():
+        cursor = db.execute(
+            "INSERT INTO league_info ({}) VALUES ({}) RETURNING league_id;".format(
+                ", ".join(["{}" for _ in keys_in_order]),
+                ", ".join(["%({})s".format(key) for key in keys_in_order])
+            ),
+            dynamic_table_or_column_names=keys_in_order,
+            values=league_basics
+        )
+        league_id = cursor.fetchone()["league_id"]
 
-    # questions provided by the creator of league, given as the keys in league_info
-    if sanitized_additional_questions:
+        # Set a default row for the league creator as an admin. The answers to 
+        # the questions in ``additional_questions`` are kept in ``responses``
         db.execute(
             (
-                "CREATE TABLE league_responses_{} ("
-                "user_id INT PRIMARY KEY UNIQUE, status VARCHAR(255), division_id INT, {});"
-            ).format(
-                league_id, ", ".join([
-                    "{} VARCHAR(255)".format(x) for x in sanitized_additional_questions
-                ])
-            )
+                "INSERT INTO league_memberships (user_id, league_id, status, responses) "
+                "VALUES (%s, %s, %s, %s);"
+            ),
+            values=[creator_user_id, league_id, STATUS_ADMIN, json.dumps({})]
         )
-    else:
-        db.execute((
-            "CREATE TABLE league_responses_{} ("
-            "user_id INT PRIMARY KEY UNIQUE, status VARCHAR(255), division_id INT);"
-        ).format(league_id))
-
-    # Set a default row for the league creator as an admin
-    db.execute(
-        "INSERT INTO {} (user_id, status) VALUES (%s, %s);",
-        values=[creator_user_id, STATUS_ADMIN],
-        dynamic_table_or_column_names=[
-            "league_responses_{}".format(league_id)
-        ]
-    )
-
-    prev_league_ids = user_model.get_user(
-        None, user_id=creator_user_id
-    )["league_ids"]
-
-    db.execute(
-        "UPDATE users SET league_ids = %s WHERE user_id = %s;",
-        values=[
-            ", ".join(str(x) for x in prev_league_ids + [league_id]),
-            creator_user_id
-        ]
-    )
+        user_model.invalidate_cached_profiles(creator_user_id)
 
     return {"success": True, "message": league_id}
 
@@ -695,21 +871,22 @@ def get_previous_responses(league_id, user_profile):
     
     If the user has not tried to join this league before
 
-    :return: ``DictRow``
+    :return: ``dict``
     
     The responses that the user previously entered while trying to join this 
-    league.
+    league, keyed by the question IDs (and ``user_id``).
 
     """
     ids_associated_leagues = set(user_profile["associated_leagues"].keys())
     if league_id not in ids_associated_leagues:
         return None
 
-    return db.execute(
-        "SELECT * from {} WHERE user_id = %s", 
-        dynamic_table_or_column_names=["league_responses_{}".format(league_id)],
-        values=[user_profile["user_id"]]
+    row = db.execute(
+        "SELECT user_id, responses FROM league_memberships WHERE user_id = %s AND league_id = %s;", 
+        values=[user_profile["user_id"], league_id]
     ).fetchone()
+    if row is None: return None
+    return dict(row["responses"] or {}, user_id=row["user_id"])
 
 def get_players_league_stats(league_id, user_id, matches=None, k=5):
     """
@@ -919,38 +1096,23 @@ def process_join_league_request(league_id, user_profile, submitted_data):
 
     # Maintain the user's league status
     if league_id in user_profile["associated_leagues"]:
-        expected_info["status"] = user_profile["associated_leagues"][league_id]["status"]
+        league_status = user_profile["associated_leagues"][league_id]["status"]
     else:
-        expected_info["status"] = STATUS_PENDING
+        league_status = STATUS_PENDING
         
-    expected_info["user_id"] = user_profile["user_id"]
-    table_name = "league_responses_{}".format(league_id)
-    db.execute(
-        "DELETE FROM {} WHERE user_id = %s", values=[user_profile["user_id"]], 
-        dynamic_table_or_column_names=[table_name]
-
-    )
     db.execute(
         (
-            "INSERT INTO {} ({}) VALUES ({});".format(
-                "{}", ", ".join(key for key in expected_info), 
-                ", ".join("%({})s".format(key) for key in expected_info)
-            )
+            "INSERT INTO league_memberships (user_id, league_id, status, responses) "
+            "VALUES (%s, %s, %s, %s) ON CONFLICT (user_id, league_id) "
+            "DO UPDATE SET status = EXCLUDED.status, responses = EXCLUDED.responses;"
         ),
-        values=expected_info,
-        dynamic_table_or_column_names=[table_name]
+        values=[user_profile["user_id"], league_id, league_status, json.dumps(expected_info)]
     )
+    user_model.invalidate_cached_profiles(user_profile["user_id"])
 
     # Indicate on the user object that they're involved in this league
     if league_id not in user_profile["league_ids"]:
         user_profile["league_ids"].append(league_id)
-        db.execute(
-            "UPDATE users SET league_ids = %s WHERE user_id = %s",
-            values=[
-                ", ".join(str(x) for x in user_profile["league_ids"]), 
-                user_profile["user_id"]
-            ]
-        )
     
     return {"success": True, "message": user_profile}
 
@@ -962,7 +1124,7 @@ def process_leave_league_request(league_id, user_profile):
 
     :param user_profile: dict 
     
-    Expected keys: ``user_id, league_ids``
+    Expected keys: ``user_id``
 
     :return: ``bool``: 
     
@@ -971,20 +1133,10 @@ def process_leave_league_request(league_id, user_profile):
 
     """
     db.execute(
-        "UPDATE {} SET status = %s WHERE user_id =  %s",
-        values=[STATUS_INACTIVE, user_profile["user_id"]], 
-        dynamic_table_or_column_names=["league_responses_{}".format(league_id)]
-    )
-    associated_league_ids = set(user_profile["league_ids"])
-    if league_id in associated_league_ids:
-        associated_league_ids.remove(league_id)
-    db.execute(
-        "UPDATE users SET league_ids=%s WHERE user_id=%s",
-        values=[
-            ", ".join([str(x) for x in associated_league_ids]),
-            user_profile["user_id"]
-        ]
+        "UPDATE league_memberships SET status = %s WHERE user_id = %s AND league_id = %s;",
+        values=[STATUS_INACTIVE, user_profile["user_id"], league_id]
     )
+    user_model.invalidate_cached_profiles(user_profile["user_id"])
     return True
 
 def process_update_league_responses(league_id, user_profile, submitted_data):
@@ -995,7 +1147,7 @@ def process_update_league_responses(league_id, user_profile, submitted_data):
 
     :param user_profile: dict
     
-    Expected keys: ``user_id, league_ids``
+    Expected keys: ``user_id``
 
     :return: ``dict``
     
@@ -1019,42 +1171,9 @@ def process_update_league_responses(league_id, user_profile, submitted_data):
             }
         expected_info[key] = submitted_data[key]
 
-    table_name = "league_responses_{}".format(league_id)
-
-    row = db.execute(
-        "SELECT * from {} WHERE user_id = %s", values=[user_profile["user_id"]], 
-        dynamic_table_or_column_names=[table_name]
-    ).fetchone()
-    if row is not None:
-        db.execute(
-            "DELETE FROM {} WHERE user_id = %s", values=[user_profile["user_id"]], 
-            dynamic_table_or_column_names=[table_name]
-
-        )
-
-    expected_info["user_id"] = user_profile["user_id"]
-    expected_info["status"] = row["status"]
-
     db.execute(
-        (
-            "INSERT INTO {} ({}) VALUES ({});".format(
-                "{}", ", ".join(key for key in expected_info), 
-                ", ".join("%({})s".format(key) for key in expected_info)
-            )
-        ),
-        values=expected_info,
-        dynamic_table_or_column_names=[table_name]
+        "UPDATE league_memberships SET responses = %s WHERE user_id = %s AND league_id = %s;",
+        values=[json.dumps(expected_info), user_profile["user_id"], league_id]
     )
-
-    # Indicate on the user object that the responses were saved
-    if league_id not in user_profile["league_ids"]:
-        # user_profile["league_ids"].append(league_id)
-        db.execute(
-            "UPDATE users SET league_ids = %s WHERE user_id = %s",
-            values=[
-                ", ".join(str(x) for x in user_profile["league_ids"]), 
-                user_profile["user_id"]
-            ]
-        )
     
     return {"success": True, "message": user_profile}
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+session_model.py
+
+Storage backends for the server-side sessions in :py:mod:`tiger_leagues.sessions`.
+A store maps an opaque session ID to the serialized contents of a session. It
+knows nothing about Flask, so that it can be swapped out (or tested) on its own.
+
+"""
+
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from . import db_model
+
+class SessionStore(ABC):
+    """
+    The interface that every session backend implements. A backend that leaves 
+    out a method can't be instantiated.
+    """
+
+    @abstractmethod
+    def load(self, session_id):
+        """
+        :param session_id: str
+
+        The opaque ID that's stored in the user's cookie
+
+        :return: ``tuple(str, datetime)``
+
+        The serialized session and when it expires
+
+        :return: ``NoneType``
+
+        If there's no such session, or it has expired
+        """
+
+    @abstractmethod
+    def save(self, session_id, data, expires_at):
+        """
+        :param session_id: str
+
+        The opaque ID that's stored in the user's cookie
+
+        :param data: str
+
+        The serialized session
+
+        :param expires_at: datetime
+
+        When the session should be discarded (timezone-aware)
+        """
+
+    @abstractmethod
+    def delete(self, session_id):
+        """
+        :param session_id: str
+
+        The ID of the session that should be discarded, e.g. on logout
+        """
+
+    @abstractmethod
+    def delete_expired(self):
+        """
+        Discard all the sessions that have expired.
+
+        :return: ``int``
+
+        The number of discarded sessions
+        """
+
+class PostgresSessionStore(SessionStore):
+    """
+    Keeps the sessions in the app's database, in the ``sessions`` table.
+
+    :kwarg database: db_model.Database
+
+    Defaults to the shared handle, ``db_model.db``
+
+    """
+
+    def __init__(self, database=None):
+        self.db = database if database is not None else db_model.db
+
+    def load(self, session_id):
+        row = self.db.execute(
+            "SELECT data, expires_at FROM sessions WHERE session_id = %s AND expires_at > NOW();",
+            values=[session_id]
+        ).fetchone()
+        if row is None: return None
+        return row["data"], row["expires_at"]
+
+    def save(self, session_id, data, expires_at):
+        self.db.execute(
+            (
+                "INSERT INTO sessions (session_id, data, expires_at) VALUES (%s, %s, %s) "
+                "ON CONFLICT (session_id) "
+                "DO UPDATE SET data = EXCLUDED.data, expires_at = EXCLUDED.expires_at;"
+            ),
+            values=[session_id, data, expires_at]
+        )
+
+    def delete(self, session_id):
+        self.db.execute("DELETE FROM sessions WHERE session_id = %s;", values=[session_id])
+
+    def delete_expired(self):
+        return self.db.execute("DELETE FROM sessions WHERE expires_at <= NOW();").rowcount
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Keeps the sessions in a local SQLite file. Handy when developing without a
+    Postgres server, but the file is not shared between machines, so it's not
+    suitable for production.
+
+    :param path: str
+
+    The path of the SQLite database file. It's created if need be.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL);"
+        )
+
+    def __execute(self, statement, parameters=()):
+        """
+        Run a statement on a new connection and commit it. SQLite connections 
+        can't be shared across threads, and opening one is cheap.
+
+        :return: ``tuple(list, int)``
+
+        The fetched rows, and the number of rows that the statement changed
+        """
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                cursor = connection.execute(statement, parameters)
+                return cursor.fetchall(), cursor.rowcount
+        finally:
+            connection.close()
+
+    def load(self, session_id):
+        rows, _ = self.__execute(
+            "SELECT data, expires_at FROM sessions WHERE session_id = ? AND expires_at > ?;",
+            (session_id, datetime.now(timezone.utc).timestamp())
+        )
+        if not rows: return None
+        return rows[0][0], datetime.fromtimestamp(rows[0][1], timezone.utc)
+
+    def save(self, session_id, data, expires_at):
+        self.__execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?);",
+            (session_id, data, expires_at.timestamp())
+        )
+
+    def delete(self, session_id):
+        self.__execute("DELETE FROM sessions WHERE session_id = ?;", (session_id,))
+
+    def delete_expired(self):
+        return self.__execute(
+            "DELETE FROM sessions WHERE expires_at <= ?;",
+            (datetime.now(timezone.utc).timestamp(),)
+        )[1]
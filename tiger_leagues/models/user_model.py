@@ -5,16 +5,217 @@ Exposes functions that are used by the controller for the `/user/*` endpoint
 
 """
 
-from operator import itemgetter
-from . import db_model
+from copy import deepcopy
+from collections import OrderedDict
+from time import monotonic
+from threading import Lock
+from . import db_model, config
 
-db = db_model.Database()
+db = db_model.db
 
 NOTIFICATION_STATUS_SEEN = "seen"
 NOTIFICATION_STATUS_DELIVERED = "delivered"
 NOTIFICATION_STATUS_ARCHIVED = "archived"
 
-def get_user(net_id, user_id=None):
+NOTIFICATION_PREVIEW_SIZE = 5
+"""
+The number of unread notifications that :py:meth:`.get_user` includes in a 
+profile. The rest are counted, but only fetched by the notifications page.
+"""
+
+NOTIFICATIONS_PAGE_SIZE = 25
+"""
+The default number of notifications on a page of ``/user/notifications/``
+"""
+
+MAX_NOTIFICATIONS_PAGE_SIZE = 100
+
+class ProfileCache:
+    """
+    A thread-safe cache of the profiles assembled by :py:meth:`.get_user`, 
+    keyed by the user ID. Entries expire after ``ttl`` seconds, and the model 
+    functions that change a profile call :py:meth:`.invalidate`. Callers get 
+    their own copy of the cached profile, so mutating it doesn't leak into 
+    other requests.
+
+    A reader takes a :py:meth:`.snapshot` before it queries the database, and 
+    hands it to :py:meth:`.put`. If the user's profile was invalidated in the 
+    meantime, what the reader fetched may predate the write, so it's not 
+    cached.
+
+    :kwarg ttl: float
+
+    The number of seconds that an entry remains valid. If ``0``, nothing is 
+    cached.
+
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        # Ordered by the time of the ``put``, and thus by expiry
+        self.__entries = OrderedDict()
+        self.__net_ids_to_user_ids = {}
+        # Each invalidation bumps ``__generation``. ``__invalidations`` maps 
+        # the recently invalidated users to ``(generation, time)``, ordered by 
+        # time. Older ones can be forgotten, since ``put`` rejects snapshots 
+        # that are older than the TTL anyway.
+        self.__generation = 0
+        self.__cleared_generation = 0
+        self.__invalidations = OrderedDict()
+        self.__lock = Lock()
+        self.__num_hits = 0
+        self.__num_misses = 0
+
+    def __evict(self, user_id):
+        """
+        Drop the entry of ``user_id``, and its net ID mapping. The lock must 
+        be held.
+        """
+        entry = self.__entries.pop(user_id, None)
+        if entry is not None and \
+                self.__net_ids_to_user_ids.get(entry[1]["net_id"]) == user_id:
+            del self.__net_ids_to_user_ids[entry[1]["net_id"]]
+
+    def __evict_expired(self, now):
+        """
+        Drop the entries that have expired, and forget the invalidations that 
+        no snapshot accepted by :py:meth:`.put` can predate. The lock must be 
+        held.
+        """
+        while self.__entries:
+            user_id, (expires_at, _) = next(iter(self.__entries.items()))
+            if expires_at > now: break
+            self.__evict(user_id)
+        while self.__invalidations:
+            _, (_, invalidated_at) = next(iter(self.__invalidations.items()))
+            if invalidated_at >= now - self.ttl: break
+            self.__invalidations.popitem(last=False)
+
+    def snapshot(self):
+        """
+        :return: ``tuple(int, float)``
+
+        The current generation of the cache, and the time. Take it before 
+        reading the data that will be passed to :py:meth:`.put`.
+        """
+        with self.__lock:
+            return self.__generation, monotonic()
+
+    def get(self, net_id=None, user_id=None):
+        """
+        :kwarg net_id: str
+
+        The Princeton Net ID of the user. Used if ``user_id`` is ``None``
+
+        :kwarg user_id: int
+
+        The ID of the user as assigned in Tiger Leagues
+
+        :return: ``dict``
+
+        A copy of the cached profile
+
+        :return: ``NoneType``
+
+        If the profile is not cached, or the cached copy has expired
+        """
+        with self.__lock:
+            now = monotonic()
+            self.__evict_expired(now)
+            if user_id is None:
+                user_id = self.__net_ids_to_user_ids.get(net_id)
+            entry = self.__entries.get(user_id)
+            if entry is None:
+                self.__num_misses += 1
+                return None
+            self.__num_hits += 1
+            return deepcopy(entry[1])
+
+    def put(self, user_profile, snapshot):
+        """
+        :param user_profile: dict
+
+        A profile as returned by :py:meth:`.get_user`
+
+        :param snapshot: tuple
+
+        What :py:meth:`.snapshot` returned before the profile was read. If the 
+        user's profile has been invalidated since, or the snapshot is older 
+        than the TTL, the profile is not cached.
+        """
+        if self.ttl <= 0: return
+        generation, read_at = snapshot
+        user_id = user_profile["user_id"]
+        with self.__lock:
+            now = monotonic()
+            self.__evict_expired(now)
+            if read_at < now - self.ttl or generation < self.__cleared_generation or \
+                    generation < self.__invalidations.get(user_id, (0, None))[0]:
+                return
+            self.__evict(user_id)
+            self.__entries[user_id] = (now + self.ttl, deepcopy(user_profile))
+            self.__net_ids_to_user_ids[user_profile["net_id"]] = user_id
+
+    def invalidate(self, user_ids=None):
+        """
+        :kwarg user_ids: int or iterable[int]
+
+        The IDs of the users whose profiles are no longer up to date. If 
+        ``None``, the whole cache is cleared.
+        """
+        with self.__lock:
+            self.__generation += 1
+            if user_ids is None:
+                self.__cleared_generation = self.__generation
+                self.__entries.clear()
+                self.__net_ids_to_user_ids.clear()
+                self.__invalidations.clear()
+                return
+            if isinstance(user_ids, int):
+                user_ids = [user_ids]
+            now = monotonic()
+            for user_id in user_ids:
+                self.__evict(user_id)
+                self.__invalidations.pop(user_id, None)
+                self.__invalidations[user_id] = (self.__generation, now)
+
+    def stats(self):
+        """
+        :return: ``dict``
+
+        Keyed by ``hits``, ``misses`` and ``size``
+        """
+        with self.__lock:
+            self.__evict_expired(monotonic())
+            return {
+                "hits": self.__num_hits, "misses": self.__num_misses, 
+                "size": len(self.__entries)
+            }
+
+profile_cache = ProfileCache(ttl=config.PROFILE_CACHE_TTL)
+"""
+The profile cache that's shared by the process. See :py:class:`.ProfileCache`
+"""
+
+def invalidate_cached_profiles(user_ids=None):
+    """
+    Drop the cached profiles of users whose leagues, notifications or details 
+    have changed. Should be called by every write path that changes what 
+    :py:meth:`.get_user` returns.
+
+    :kwarg user_ids: int or iterable[int]
+
+    The IDs of the affected users. If ``None``, the whole cache is cleared.
+
+    """
+    if user_ids is not None and not isinstance(user_ids, int):
+        user_ids = list(user_ids)
+    profile_cache.invalidate(user_ids)
+    # A concurrent request may re-cache the old profile before the enclosing 
+    # transaction commits, so drop it again afterwards
+    db.call_after_commit(lambda: profile_cache.invalidate(user_ids))
+
+def get_user(net_id, user_id=None, use_cache=False):
     """
     :param net_id: str
     
@@ -24,24 +225,39 @@ def get_user(net_id, user_id=None):
 
     The ID of the user as assigned in Tiger Leagues
 
+    :kwarg use_cache: bool
+
+    If ``True``, serve the profile from :py:data:`.profile_cache` when 
+    possible. Useful for the requests that only need the profile to render 
+    the navigation bar.
+
     :return: ``dict`` 
     
     A representation of the user as stored in the database. Keys include: 
     ``user_id, name, net_id, email, phone_num, room, league_ids, 
-    associated_leagues, unread_notifications``
+    associated_leagues, unread_notifications, num_unread_notifications``. 
+    ``unread_notifications`` only holds the ``NOTIFICATION_PREVIEW_SIZE`` 
+    most recent ones.
     
     :return: ``NoneType``
 
     If there is no user in the database with the provided net id
     """
+    if use_cache:
+        user_profile = profile_cache.get(net_id=net_id, user_id=user_id)
+        if user_profile is not None: return user_profile
+    # Taken before the reads, so that a write that commits while they run 
+    # keeps this (possibly stale) profile out of the cache
+    cache_snapshot = profile_cache.snapshot()
+
     if net_id is not None:
         cursor = db.execute((
-            "SELECT user_id, name, net_id, email, phone_num, room, league_ids "
+            "SELECT user_id, name, net_id, email, phone_num, room "
             "FROM users WHERE net_id = %s"
         ), values=[net_id])
     else:
         cursor = db.execute((
-            "SELECT user_id, name, net_id, email, phone_num, room, league_ids "
+            "SELECT user_id, name, net_id, email, phone_num, room "
             "FROM users WHERE user_id = %s"
         ), values=[user_id])
 
@@ -51,18 +267,22 @@ def get_user(net_id, user_id=None):
     # Although psycopg2 allows us to change values already in the table, we 
     # cannot add new fields that weren't columns, thus the need for a new dict
     mutable_user_data = dict(**user_profile) # https://www.python.org/dev/peps/pep-0448/#abstract
-    if user_profile["league_ids"] is None:
-        mutable_user_data["league_ids"] = []
-        mutable_user_data["associated_leagues"] = {}
-    else:
-        mutable_user_data["league_ids"] = [int(x) for x in user_profile["league_ids"].split(", ")]
-        mutable_user_data["associated_leagues"] = __get_user_leagues_info(
-            user_profile["user_id"], mutable_user_data["league_ids"]
-        )
+    mutable_user_data["associated_leagues"] = __get_user_leagues_info(
+        user_profile["user_id"]
+    )
+    mutable_user_data["league_ids"] = list(mutable_user_data["associated_leagues"].keys())
     
+    mutable_user_data["num_unread_notifications"] = count_unread_notifications(
+        user_profile["user_id"]
+    )
     mutable_user_data["unread_notifications"] = read_notifications(
-        user_profile["user_id"], notification_status=NOTIFICATION_STATUS_DELIVERED
+        user_profile["user_id"], notification_status=NOTIFICATION_STATUS_DELIVERED,
+        page_size=NOTIFICATION_PREVIEW_SIZE
     )
+    # Within a transaction, the profile may include rows that are never 
+    # committed
+    if not db.in_transaction():
+        profile_cache.put(mutable_user_data, cache_snapshot)
     return mutable_user_data
 
 def update_user_profile(user_profile, net_id, submitted_data):
@@ -113,46 +333,35 @@ def update_user_profile(user_profile, net_id, submitted_data):
             values=updated_col_values + [user_profile["user_id"]],
             dynamic_table_or_column_names=updated_col_names
         )
+        invalidate_cached_profiles(user_profile["user_id"])
 
     return get_user(net_id)
 
-def __get_user_leagues_info(user_id, league_ids):
+def __get_user_leagues_info(user_id):
     """
     :param user_id: int
     
     The ID of the associated user.
 
-    :param league_ids: list[int]
-    
-    A list of all the league IDs that a user is associated with
-
     :return: `dict[dict]`
     
-    Contains all leagues that a user is associated with. Each dict is keyed by: 
-    ``league_name``, ``league_id``, ``status``.
+    Contains all leagues that a user is associated with, i.e. the ones that they 
+    haven't left. Each dict is keyed by: ``league_name``, ``league_id``, 
+    ``status``, ``division_id``.
     
     """
-    user_leagues_info = {}
-    for league_id in league_ids:
-        league_responses_tablename = "league_responses_{}".format(league_id)
-        cursor = db.execute(
-            (
-                "SELECT league_info.league_id, league_name, status, {}.division_id "
-                "FROM league_info, {} "
-                "WHERE {}.user_id = %s AND league_info.league_id = %s"
-            ),
-            values=[user_id, league_id],
-            dynamic_table_or_column_names=[
-                league_responses_tablename,
-                league_responses_tablename,
-                league_responses_tablename
-            ]
-        )
-        info = cursor.fetchone()
-        if info is not None:
-            user_leagues_info[int(league_id)] = dict(**info)
-        
-    return user_leagues_info
+    # Users who left a league keep their membership with an 'inactive' status
+    cursor = db.execute(
+        (
+            "SELECT league_info.league_id, league_name, status, division_id "
+            "FROM league_memberships, league_info "
+            "WHERE league_memberships.user_id = %s AND status != %s "
+            "AND league_info.league_id = league_memberships.league_id "
+            "ORDER BY league_info.league_id;"
+        ),
+        values=[user_id, "inactive"]
+    )
+    return {row["league_id"]: dict(**row) for row in cursor}
 
 def send_notification(user_id, notification):
     """
@@ -176,20 +385,54 @@ def send_notification(user_id, notification):
     If the method failed
 
     """
+    notification_ids = send_notifications([dict(notification, user_id=user_id)])
+    if notification_ids is None: return None
+    return notification_ids[0]
+
+def send_notifications(notifications):
+    """
+    Deliver several notifications in a single statement, e.g. when telling all 
+    the members of a league about a change.
 
-    if "league_id" not in notification or "notification_text" not in notification:
+    :param notifications: list[dict]
+
+    Expected keys in each dict: ``user_id, league_id, notification_text``. The 
+    ``league_id`` is ``None`` for notifications that aren't tied to a league.
+
+    :return: ``list[int]``
+
+    The IDs of the delivered notifications
+
+    :return: ``NoneType``
+
+    If any of the notifications lacks an expected key, in which case none of 
+    them is delivered
+
+    """
+    expected_keys = {"user_id", "league_id", "notification_text"}
+    if any(not expected_keys.issubset(notification) for notification in notifications):
         return None
-    
-    return db.execute(
+    if not notifications: return []
+
+    cursor = db.execute_many(
         (
             "INSERT INTO notifications ("
-            "user_id, league_id, notification_status, notification_text)"
-            "VALUES (%s, %s, %s, %s) RETURNING notification_id;"
-        ), 
-        values=[user_id, notification["league_id"], NOTIFICATION_STATUS_DELIVERED, notification["notification_text"]]
-    ).fetchone()["notification_id"]
+            "user_id, league_id, notification_status, notification_text) "
+            "VALUES %s RETURNING notification_id;"
+        ),
+        [
+            (
+                notification["user_id"], notification["league_id"], 
+                NOTIFICATION_STATUS_DELIVERED, notification["notification_text"]
+            ) for notification in notifications
+        ],
+        page_size=len(notifications)
+    )
+    notification_ids = [row["notification_id"] for row in cursor]
+    invalidate_cached_profiles({notification["user_id"] for notification in notifications})
+    return notification_ids
 
-def read_notifications(user_id, notification_status=None):
+def read_notifications(user_id, notification_status=None, before=None, page_size=None):
     """
     :param user_id: int
 
@@ -200,43 +443,80 @@ def read_notifications(user_id, notification_status=None):
     The status of the notifications that are to be read. If ``None``, this defaults 
     to notifications that have not been archived.
 
-    :return: ``cursor``
+    :kwarg before: tuple(datetime, int)
+
+    The ``(created_at, notification_id)`` of the last notification on the 
+    previous page. Only older notifications are returned. If ``None``, start 
+    from the most recent notification.
 
-    An iterable cursor where each item keyed by ``notification_id``, 
-    ``notification_status``, ``notification_text``, ``created_at``, ``league_name``.
+    :kwarg page_size: int
+
+    The maximum number of notifications to return. If ``None``, all of them 
+    are returned.
+
+    :return: ``list[dict]``
+
+    The notifications, newest first. Each dict is keyed by ``notification_id``, 
+    ``notification_status``, ``notification_text``, ``created_at``, 
+    ``league_id``, ``league_name``. Notifications that aren't tied to a league 
+    have ``[Tiger Leagues]`` as their league name. Notifications of leagues 
+    that have since been deleted are left out.
 
     """
     if notification_status is None:
-        notifications = db.execute(
-            (
-                "SELECT notifications.*, league_info.league_name FROM notifications, league_info "
-                "WHERE user_id = %s AND notification_status != %s AND league_info.league_id = notifications.league_id "
-                "ORDER BY created_at DESC;"
-            ),
-            values=[user_id, NOTIFICATION_STATUS_ARCHIVED]
-        ).fetchall()
-
+        conditions = ["user_id = %(user_id)s", "notification_status != %(archived)s"]
     else:
-        notifications = db.execute(
-            (
-                "SELECT notifications.*, league_info.league_name FROM notifications, league_info "
-                "WHERE user_id = %s AND notification_status = %s AND league_info.league_id = notifications.league_id "
-                "ORDER BY created_at DESC;"
-            ),
-            values=[user_id, notification_status]
-        ).fetchall()
+        conditions = ["user_id = %(user_id)s", "notification_status = %(status)s"]
+    conditions.append(
+        "(notifications.league_id IS NULL OR league_info.league_id IS NOT NULL)"
+    )
+    if before is not None:
+        # Keyset pagination: resume right after the last row of the previous 
+        # page, instead of counting past the skipped rows with OFFSET
+        conditions.append("(created_at, notification_id) < (%(created_at)s, %(notification_id)s)")
+        
+    cursor = db.execute(
+        (
+            "SELECT notifications.*, "
+            "COALESCE(league_info.league_name, '[Tiger Leagues]') AS league_name "
+            "FROM notifications LEFT JOIN league_info "
+            "ON league_info.league_id = notifications.league_id "
+            "WHERE {} "
+            "ORDER BY created_at DESC, notification_id DESC LIMIT %(page_size)s;"
+        ).format(" AND ".join(conditions)),
+        values={
+            "user_id": user_id, "archived": NOTIFICATION_STATUS_ARCHIVED, 
+            "status": notification_status, "page_size": page_size,
+            "created_at": before[0] if before else None, 
+            "notification_id": before[1] if before else None
+        }
+    )
+    return [dict(**notification) for notification in cursor]
 
-    system_notifications = db.execute(
-        "SELECT * FROM notifications WHERE league_id IS NULL AND user_id = %s;",
-        values=[user_id]
-    ).fetchall()
+def count_unread_notifications(user_id):
+    """
+    :param user_id: int
 
-    # This is not as bad as it looks. 
-    # Python uses timsort that takes advantage of already sorted subsequences
-    # https://stackoverflow.com/questions/10948920/what-algorithm-does-pythons-sorted-use
-    all_notifications = notifications + [dict(league_name="[Tiger Leagues]", **x) for x in system_notifications]
-    all_notifications.sort(key=itemgetter("created_at"), reverse=True)
-    return all_notifications
+    The ID of the associated user
+
+    :return: ``int``
+
+    The number of notifications that have been delivered to the user but not 
+    seen yet. Both columns of the predicate lead the 
+    ``notifications_user_id_status_created_at_id`` index, so the count is an 
+    index-only scan over the user's unread entries, and the table's rows are 
+    not visited. A deleted league's notifications are deleted with it (see 
+    :py:meth:`tiger_leagues.models.admin_model.delete_league`), so they need 
+    not be filtered out here.
+
+    """
+    return db.execute(
+        (
+            "SELECT COUNT(*) AS num_unread FROM notifications "
+            "WHERE user_id = %s AND notification_status = %s;"
+        ),
+        values=[user_id, NOTIFICATION_STATUS_DELIVERED]
+    ).fetchone()["num_unread"]
 
 def update_notification_status(user_id, notification_obj):
     """
@@ -278,6 +558,7 @@ def update_notification_status(user_id, notification_obj):
             "DELETE FROM notifications WHERE notification_id = %s AND user_id = %s RETURNING notification_id;",
             values=[notification_obj["notification_id"], user_id]
         ).fetchone()["notification_id"]
+        invalidate_cached_profiles(user_id)
 
         if deleted_notification_id == notification_obj["notification_id"]:
             return {"success": True, "message": "deleted"}
@@ -293,6 +574,7 @@ def update_notification_status(user_id, notification_obj):
             submitted_status, notification_obj["notification_id"], user_id
         ]
     ).fetchone()["notification_status"]
+    invalidate_cached_profiles(user_id)
 
     return {
         "success": True if new_status == submitted_status else False,
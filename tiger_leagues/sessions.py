@@ -0,0 +1,213 @@
+"""
+sessions.py
+
+Keeps the contents of Flask's ``session`` on the server. The cookie only carries
+a signed, opaque session ID, instead of the whole user profile (which includes
+the user's leagues and unread notifications, and thus grows over time).
+
+http://flask.pocoo.org/docs/1.0/api/#session-interface
+
+"""
+
+import os
+from secrets import token_urlsafe
+from datetime import datetime, timezone
+
+from flask.sessions import (
+    SessionInterface, SessionMixin, SecureCookieSessionInterface,
+    session_json_serializer
+)
+from werkzeug.datastructures import CallbackDict
+from itsdangerous import Signer, BadSignature, want_bytes
+
+from .models import config, session_model
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """
+    A session whose contents are loaded from a
+    :py:class:`tiger_leagues.models.session_model.SessionStore`
+
+    :kwarg initial: dict
+
+    The contents of the session
+
+    :kwarg session_id: str
+
+    The opaque ID of the session
+
+    :kwarg new: bool
+
+    ``True`` if the session was not found in the store
+
+    :kwarg serialized: str
+
+    The contents of the session as they were loaded from the store
+
+    :kwarg expires_at: datetime
+
+    When the stored session expires
+
+    """
+
+    def __init__(self, initial=None, session_id=None, new=False, serialized=None,
+                 expires_at=None):
+        def on_update(session):
+            session.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.session_id = session_id
+        self.new = new
+        self.modified = False
+        self.serialized = serialized
+        self.expires_at = expires_at
+        self.stale_session_ids = []
+
+    def regenerate(self):
+        """
+        Give the session a new ID, keeping its contents. The old ID is removed 
+        from the store when the session is saved, so a session ID that was 
+        known before the user logged in (e.g. one planted by an attacker) can't 
+        be used afterwards.
+        """
+        if not self.new:
+            self.stale_session_ids.append(self.session_id)
+        self.session_id = token_urlsafe(32)
+        self.new = True
+        self.serialized = None
+        self.modified = True
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Stores the sessions in a
+    :py:class:`tiger_leagues.models.session_model.SessionStore`. The sessions are
+    serialized in the same way as Flask's default cookie sessions, so values
+    such as dates survive the round-trip unchanged.
+
+    :param store: session_model.SessionStore
+
+    Where the sessions are kept
+
+    """
+
+    salt = "tiger-leagues-session"
+    serializer = session_json_serializer
+    num_saves_between_purges = 1000
+
+    def __init__(self, store):
+        self.store = store
+        self.__num_saves = 0
+
+    def __get_signer(self, app):
+        """
+        :return: ``itsdangerous.Signer``
+
+        Signs the session IDs with the app's secret key
+
+        :return: ``NoneType``
+
+        If the app has no secret key, in which case sessions are unavailable
+        """
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        signer = self.__get_signer(app)
+        if signer is None:
+            return None
+
+        cookie_value = request.cookies.get(app.session_cookie_name)
+        if cookie_value:
+            try:
+                session_id = signer.unsign(cookie_value).decode("ascii")
+            except BadSignature:
+                session_id = None
+
+            stored_session = self.store.load(session_id) if session_id else None
+            if stored_session is not None:
+                serialized, expires_at = stored_session
+                return ServerSideSession(
+                    self.serializer.loads(serialized), session_id=session_id,
+                    serialized=serialized, expires_at=expires_at
+                )
+
+        return ServerSideSession(session_id=token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        for stale_session_id in session.stale_session_ids:
+            self.store.delete(stale_session_id)
+        session.stale_session_ids = []
+
+        if not session:
+            # The session was emptied, e.g. when the user logged out
+            if session.modified:
+                if not session.new:
+                    self.store.delete(session.session_id)
+                response.delete_cookie(app.session_cookie_name, domain=domain, path=path)
+            return
+
+        # Most requests re-assign the same profile, so only write to the store
+        # when the contents changed or the session is at least half-way expired
+        now = datetime.now(timezone.utc)
+        lifetime = app.permanent_session_lifetime
+        serialized = self.serializer.dumps(dict(session))
+        if serialized != session.serialized or session.expires_at is None or \
+                session.expires_at - now < lifetime / 2:
+            self.store.save(session.session_id, serialized, now + lifetime)
+            self.__num_saves += 1
+            if self.__num_saves % self.num_saves_between_purges == 0:
+                self.store.delete_expired()
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        response.set_cookie(
+            app.session_cookie_name,
+            self.__get_signer(app).sign(want_bytes(session.session_id)).decode("ascii"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+def regenerate_session(session):
+    """
+    Prevent session fixation: call this whenever the user's privileges change, 
+    i.e. on login and logout.
+
+    :param session: flask.sessions.SessionMixin
+
+    The current session. A :py:class:`ServerSideSession` gets a new ID. Flask's 
+    cookie sessions are left as they are, since the cookie holds the contents 
+    themselves, and changing the contents changes the cookie.
+
+    """
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+def make_session_interface(app):
+    """
+    :param app: Flask
+
+    The app that the sessions are for. ``app.config["SESSION_STORE"]``, if set,
+    overrides ``config.SESSION_STORE``.
+
+    :return: ``flask.sessions.SessionInterface``
+
+    The session interface for the configured backend: ``cookie`` (Flask's 
+    default, which keeps the whole session in the cookie), ``postgres`` or 
+    ``sqlite``
+
+    """
+    store_name = app.config.get("SESSION_STORE", config.SESSION_STORE)
+    if store_name == "cookie":
+        return SecureCookieSessionInterface()
+    if store_name == "sqlite":
+        return ServerSideSessionInterface(session_model.SQLiteSessionStore(
+            os.path.join(app.instance_path, config.SESSION_SQLITE_PATH)
+        ))
+    return ServerSideSessionInterface(session_model.PostgresSessionStore())
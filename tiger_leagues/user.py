@@ -5,9 +5,12 @@ Exposes a blueprint that handles requests made to `/user/*` endpoint
 
 """
 
+from datetime import datetime
+
 from flask import Blueprint, render_template, session, request, flash, jsonify
 from . import decorators
 from .models import user_model
+from .models.exception import TigerLeaguesException
 
 bp = Blueprint("user", __name__, url_prefix="/user")
 
@@ -51,12 +54,37 @@ def view_notifications():
     """
     :return: ``flask.Response(mimetype-'text/html')``
 
-    Render the user's pending messages
+    Render a page of the user's pending messages. The optional ``page_size`` 
+    query parameter sets the number of messages per page. The optional 
+    ``before`` query parameter, formatted as ``<created_at>,<notification_id>``, 
+    selects the page that follows the given message.
     """
     user_id = session.get("user")["user_id"]
+    page_size = min(
+        max(request.args.get("page_size", user_model.NOTIFICATIONS_PAGE_SIZE, type=int), 1),
+        user_model.MAX_NOTIFICATIONS_PAGE_SIZE
+    )
+
+    before = None
+    if request.args.get("before"):
+        try:
+            created_at, notification_id = request.args["before"].rsplit(",", 1)
+            before = (datetime.fromisoformat(created_at), int(notification_id))
+        except ValueError:
+            raise TigerLeaguesException("Invalid value for 'before'", jsonify=False)
+
+    notifications = user_model.read_notifications(
+        user_id, before=before, page_size=page_size
+    )
+    next_page_before = None
+    if len(notifications) == page_size:
+        next_page_before = "{},{}".format(
+            notifications[-1]["created_at"].isoformat(), notifications[-1]["notification_id"]
+        )
     return render_template(
         "/user/user_notifications.html", 
-        notifications=user_model.read_notifications(user_id)
+        notifications=notifications, page_size=page_size, 
+        next_page_before=next_page_before
     )
 
 @bp.route("/notifications/", methods=["POST"])